@@ -1,8 +1,9 @@
-import json
-import re
 import os
+from bisect import bisect_left
 import google.generativeai as genai
-from typing import Dict, List, Tuple, Any
+from typing import Dict, List, Tuple, Any, Optional
+from keyword_dictionaries import KeywordDictionary
+from llm_schemas import parse_llm_json, validate_llm_response, response_format, build_reask_prompt
 
 # A curated set of profane words for pattern matching.
 PROFANITY_WORDS = {
@@ -22,17 +23,25 @@ VERIFICATION_KEYWORDS = {
     'mother maiden name', 'security question', 'verify', 'confirm your identity'
 }
 
-def analyze_profanity_pattern(data: List[Dict[str, Any]]) -> Tuple[bool, bool, List[Dict]]:
+# Compiled once at import; per-client dictionaries come from a KeywordDictionaryStore.
+DEFAULT_DICTIONARY = KeywordDictionary.from_sets({
+    'profanity': PROFANITY_WORDS,
+    'sensitive': SENSITIVE_KEYWORDS,
+    'verification': VERIFICATION_KEYWORDS,
+}, source='builtin')
+
+def analyze_profanity_pattern(data: List[Dict[str, Any]],
+                              dictionary: Optional[KeywordDictionary] = None) -> Tuple[bool, bool, List[Dict]]:
     """Analyzes conversation for profanity using direct keyword matching."""
+    profanity = (dictionary or DEFAULT_DICTIONARY).profanity
     profanity_details = []
     agent_profanity = False
     customer_profanity = False
 
     for entry in data:
         text = entry.get('text', '').lower()
-        words = set(re.findall(r'\b\w+\b', text))
         
-        if PROFANITY_WORDS.intersection(words):
+        if profanity.contains(text):
             speaker = entry.get('speaker', '').lower()
             profanity_details.append({
                 'speaker': speaker,
@@ -46,8 +55,11 @@ def analyze_profanity_pattern(data: List[Dict[str, Any]]) -> Tuple[bool, bool, L
     
     return agent_profanity, customer_profanity, profanity_details
 
-def analyze_compliance_pattern(data: List[Dict[str, Any]]) -> Tuple[bool, List[Dict]]:
+def analyze_compliance_pattern(data: List[Dict[str, Any]],
+                               dictionary: Optional[KeywordDictionary] = None) -> Tuple[bool, List[Dict]]:
     """Analyzes for compliance violations by checking if sensitive info was shared before verification."""
+    dictionary = dictionary or DEFAULT_DICTIONARY
+    sensitive, verification = dictionary.sensitive, dictionary.verification
     violation_details = []
     verified = False
 
@@ -56,10 +68,10 @@ def analyze_compliance_pattern(data: List[Dict[str, Any]]) -> Tuple[bool, List[D
         text = entry.get('text', '').lower()
 
         if 'agent' in speaker:
-            if not verified and any(keyword in text for keyword in VERIFICATION_KEYWORDS):
+            if not verified and verification.contains(text):
                 verified = True
 
-            matched_keywords = [kw for kw in SENSITIVE_KEYWORDS if kw in text]
+            matched_keywords = sensitive.find(text)
             if matched_keywords and not verified:
                 violation_details.append({
                     'text': entry.get('text', ''),
@@ -70,46 +82,148 @@ def analyze_compliance_pattern(data: List[Dict[str, Any]]) -> Tuple[bool, List[D
     violation_found = len(violation_details) > 0
     return violation_found, violation_details
 
-def analyze_with_llm(data: List[Dict[str, Any]], entity: str, api_key: str) -> Dict[str, Any]:
-    """Analyzes conversation using the Gemini generative AI model."""
-    if not api_key:
-        return {"error": "Gemini API key is not set."}
+LLM_MODEL_NAME = 'gemini-2.0-flash'
+GENERATION_CONFIG = {"response_mime_type": "application/json", "temperature": 0.1}
+# Follow-up requests allowed for fields that are missing or malformed in the first response.
+MAX_LLM_REASKS = 1
 
-    try:
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-2.0-flash')
-    except Exception as e:
-        return {"error": f"Error configuring Gemini API: {e}"}
+# Prompts for transcripts longer than this are compacted before being sent to the LLM.
+DEFAULT_PROMPT_TOKEN_BUDGET = 2000
+# Seconds of context kept on either side of a keyword hit when compacting.
+COMPACTION_WINDOW = 15.0
+# Number of opening utterances always kept, since they set up who is on the call.
+COMPACTION_HEADER_SIZE = 2
+
+def estimate_tokens(text: str) -> int:
+    """Cheap local token estimate (~4 characters per token for English text)."""
+    return (len(text) + 3) // 4
+
+def _format_utterance(item: Dict[str, Any]) -> str:
+    return f"{item['speaker']} ({item.get('stime', 0)}s): {item['text']}"
+
+def compact_transcript(data: List[Dict[str, Any]], entity: str,
+                       token_budget: int = DEFAULT_PROMPT_TOKEN_BUDGET,
+                       window: float = COMPACTION_WINDOW,
+                       dictionary: Optional[KeywordDictionary] = None) -> str:
+    """
+    Builds the conversation text for an LLM prompt within a token budget.
+
+    Transcripts that already fit are returned verbatim. Otherwise the opening utterances and
+    every utterance with a candidate keyword hit for the entity are kept first, then neighbours
+    within `window` seconds of a hit, closest first, then the remaining utterances in order,
+    until the budget is spent. Dropped stretches are replaced by an omission marker so the model
+    knows the excerpt is not contiguous.
+    """
+    lines = [_format_utterance(item) for item in data]
+    costs = [estimate_tokens(line) + 1 for line in lines]
+    if sum(costs) <= token_budget:
+        return "\n".join(lines)
+
+    dictionary = dictionary or DEFAULT_DICTIONARY
+    if entity == 'Profanity Detection':
+        indexes = [dictionary.profanity]
+    else:
+        indexes = [dictionary.sensitive, dictionary.verification]
+    hits = [
+        i for i, item in enumerate(data)
+        if any(index.contains(item.get('text', '').lower()) for index in indexes)
+    ]
+
+    header = list(range(min(COMPACTION_HEADER_SIZE, len(data))))
+    hit_starts = sorted((data[i].get('stime', 0), i) for i in hits)
+    start_times = [start for start, _ in hit_starts]
+
+    def distance_to_hit(i: int) -> float:
+        start, end = data[i].get('stime', 0), data[i].get('etime', 0)
+        pos = bisect_left(start_times, start)
+        best = float('inf')
+        for j in (pos - 1, pos):
+            if 0 <= j < len(hit_starts):
+                hit = data[hit_starts[j][1]]
+                best = min(best, max(0, hit.get('stime', 0) - end, start - hit.get('etime', 0)))
+        return best
+
+    neighbours = []
+    for i in range(len(data)):
+        distance = distance_to_hit(i)
+        if distance <= window:
+            neighbours.append((distance, i))
+    neighbours.sort()
+    priority = header + hits + [i for _, i in neighbours] + list(range(len(data)))
 
-    conversation_str = "\n".join(
-        f"{item['speaker']} ({item.get('stime', 0)}s): {item['text']}" for item in data
-    )
+    marker_cost = estimate_tokens(f"[... {len(data)} utterances omitted ...]") + 1
+    selected = [False] * len(data)
+    # Everything starts out as one omitted stretch.
+    spent = marker_cost
+    for i in priority:
+        if selected[i]:
+            continue
+        # Keeping i splits its omitted stretch into the parts left and right of it, if any.
+        gap_change = (i > 0 and not selected[i - 1]) + (i + 1 < len(data) and not selected[i + 1]) - 1
+        cost = costs[i] + gap_change * marker_cost
+        if spent + cost > token_budget:
+            continue
+        selected[i] = True
+        spent += cost
+
+    output = []
+    skipped = 0
+    for i, line in enumerate(lines):
+        if selected[i]:
+            if skipped:
+                output.append(f"[... {skipped} utterances omitted ...]")
+                skipped = 0
+            output.append(line)
+        else:
+            skipped += 1
+    if skipped:
+        output.append(f"[... {skipped} utterances omitted ...]")
+    return "\n".join(output)
+
+def analyze_with_llm(data: List[Dict[str, Any]], entity: str, api_key: str,
+                     token_budget: Optional[int] = DEFAULT_PROMPT_TOKEN_BUDGET,
+                     dictionary: Optional[KeywordDictionary] = None,
+                     max_reasks: int = MAX_LLM_REASKS,
+                     model: Optional[Any] = None) -> Dict[str, Any]:
+    """
+    Analyzes conversation using the Gemini generative AI model.
+
+    Long transcripts are compacted to `token_budget` tokens around keyword hits before being
+    sent; pass `token_budget=None` to always send the full transcript. The response is checked
+    against the entity's schema in llm_schemas.py, and only fields that are missing or malformed
+    are asked for again, up to `max_reasks` times.
+
+    `model` may be any object with Gemini's `generate_content` interface (e.g. the recording
+    and replaying models in llm_replay.py); the API key is only needed when it is omitted.
+    """
+    if model is None:
+        if not api_key:
+            return {"error": "Gemini API key is not set."}
+
+        try:
+            genai.configure(api_key=api_key)
+            model = genai.GenerativeModel(LLM_MODEL_NAME)
+        except Exception as e:
+            return {"error": f"Error configuring Gemini API: {e}"}
+
+    if token_budget is None:
+        conversation_str = "\n".join(_format_utterance(item) for item in data)
+    else:
+        conversation_str = compact_transcript(data, entity, token_budget, dictionary=dictionary)
     
     prompts = {
         'Profanity Detection': f"""
         Analyze this customer service conversation for profane or inappropriate language.
         Look for explicit profanity, unprofessional language, and disrespectful terms.
         Conversation: {conversation_str}
-        Respond with JSON: {{
-            "agent_profanity": boolean,
-            "customer_profanity": boolean,
-            "agent_examples": ["specific profane text from agent"],
-            "customer_examples": ["specific profane text from customer"],
-            "profanity_confidence": "high/medium/low"
-        }}
+        Respond with JSON: {response_format('Profanity Detection')}
         """,
         'Privacy and Compliance Violation': f"""
         Analyze this debt collection call for compliance violations. A violation occurs if an agent
         shares sensitive info (account balance, SSN, etc.) BEFORE verifying the customer's identity
         (by asking for DOB, address, etc.).
         Conversation: {conversation_str}
-        Respond with JSON: {{
-            "compliance_violation": boolean,
-            "verification_attempted": boolean,
-            "violation_examples": ["specific violations"],
-            "verification_examples": ["verification attempts"],
-            "compliance_confidence": "high/medium/low"
-        }}
+        Respond with JSON: {response_format('Privacy and Compliance Violation')}
         """
     }
 
@@ -118,23 +232,28 @@ def analyze_with_llm(data: List[Dict[str, Any]], entity: str, api_key: str) -> D
         return {"error": "Invalid entity for LLM analysis."}
 
     try:
-        response = model.generate_content(
-            prompt, 
-            generation_config={"response_mime_type": "application/json", "temperature": 0.1}
-        )
-        cleaned_text = re.sub(r'```json\s*|\s*```', '', response.text.strip(), flags=re.DOTALL)
-        
-        # --- FIX IS HERE ---
-        parsed_response = json.loads(cleaned_text)
-        # Handle cases where the response is a list containing a single dictionary
-        if isinstance(parsed_response, list) and parsed_response:
-            return parsed_response[0]
-        elif isinstance(parsed_response, dict):
-            return parsed_response
-        else:
-            return {"error": "Received an unexpected format from LLM."}
+        response = model.generate_content(prompt, generation_config=GENERATION_CONFIG)
+        try:
+            payload = parse_llm_json(response.text)
+        except ValueError:
+            payload = {}
+        result, invalid = validate_llm_response(entity, payload)
+
+        for _ in range(max_reasks):
+            if not invalid:
+                break
+            reask = build_reask_prompt(entity, conversation_str, invalid, result)
+            response = model.generate_content(reask, generation_config=GENERATION_CONFIG)
+            try:
+                payload = parse_llm_json(response.text)
+            except ValueError:
+                continue
+            fixed, invalid = validate_llm_response(entity, payload, fields=invalid)
+            result.update(fixed)
+
+        if invalid:
+            return {"error": f"LLM response was missing or had invalid fields: {', '.join(invalid)}"}
+        return result
 
-    except json.JSONDecodeError:
-        return {"error": "Failed to decode JSON from LLM response."}
     except Exception as e:
         return {"error": f"An error occurred with the Gemini API: {e}"}
@@ -3,6 +3,8 @@ import yaml
 import json
 from analysis_functions import analyze_profanity_pattern, analyze_compliance_pattern, analyze_with_llm
 from call_quality import calculate_call_quality_metrics, create_call_quality_visualizations
+from transcript_validation import normalize_transcript, TranscriptValidationError
+from call_triage import classify_call
 
 # --- Sample Data ---
 SAMPLE_DATA = {
@@ -223,6 +225,22 @@ st.set_page_config(
 
 # --- UI Display Functions ---
 
+def display_validation_notes(transcript):
+    """Summarizes rows dropped while normalizing the transcript."""
+    if transcript.rejected:
+        with st.expander(f"⚠️ {len(transcript.rejected)} invalid row(s) were skipped", expanded=False):
+            for r in transcript.rejected:
+                st.caption(f"Row {r['index']}: {r['reason']}")
+    if transcript.duplicates:
+        st.caption(f"{len(transcript.duplicates)} duplicate row(s) were merged.")
+
+def display_triage(data):
+    """Notes when the call looks like a voicemail, no-answer or wrong-party call."""
+    triage = classify_call(data)
+    labels = {'voicemail': "📭 Voicemail", 'no_answer': "📵 No Answer", 'wrong_party': "🙅 Wrong Party"}
+    if triage['category'] in labels:
+        st.info(f"{labels[triage['category']]} call detected — {triage['reason']}")
+
 def display_llm_analysis(entity, llm_result):
     """Displays the results from the LLM analysis in a clean, single column."""
     st.subheader("🧠 AI-Powered Analysis")
@@ -363,6 +381,13 @@ def main():
         data = SAMPLE_DATA[selected_sample]
         data_source_name = selected_sample
 
+    if data is not None:
+        try:
+            data = normalize_transcript(data)
+        except TranscriptValidationError as e:
+            st.error(f"Invalid conversation data: {e}")
+            return
+
     if not data:
         st.info("👋 **Welcome!** Please upload a conversation file or select a sample conversation to begin analysis.")
         
@@ -403,6 +428,8 @@ def main():
         return
 
     st.success(f"Data **`{data_source_name}`** is loaded and ready for analysis.")
+    display_validation_notes(data)
+    display_triage(data)
     
     analyze_button = st.button("Analyze Conversation", type="primary")
 
@@ -436,17 +463,17 @@ def main():
             # --- Call Quality Metrics Section ---
             with st.container(border=True):
                 st.subheader("📈 Call Quality Overview")
-                call_metrics = calculate_call_quality_metrics(data)
+                call_metrics = calculate_call_quality_metrics(data, intervals='none')
                 m_col1, m_col2, m_col3, m_col4 = st.columns(4)
                 m_col1.metric("Total Duration", f"{call_metrics['total_duration']}s")
                 m_col2.metric("Silence %", f"{call_metrics['silence_percentage']:.2f}%")
                 m_col3.metric("Overtalk %", f"{call_metrics['overtalk_percentage']:.2f}%")
                 
-                agent_time = sum((i['end'] - i['start']) for i in call_metrics.get('speaking_intervals', []) if i['speaker'].lower() == 'agent')
-                customer_time = sum((i['end'] - i['start']) for i in call_metrics.get('speaking_intervals', []) if i['speaker'].lower() != 'agent')
+                agent_time = call_metrics['agent_speaking_time']
+                customer_time = call_metrics['customer_speaking_time']
                 m_col4.metric("Agent vs Customer Talk Time", f"{agent_time:.1f}s / {customer_time:.1f}s")
                 
-                fig = create_call_quality_visualizations(call_metrics)
+                fig = create_call_quality_visualizations(call_metrics, data)
                 st.plotly_chart(fig, use_container_width=True)
 
             st.markdown("---")
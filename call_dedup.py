@@ -0,0 +1,160 @@
+import re
+import zlib
+from typing import Dict, List, Tuple, Any, Callable, Iterable, Iterator, Optional
+
+_MASK64 = (1 << 64) - 1
+_GOLDEN = 0x9E3779B97F4A7C15
+# Offset added to values borrowed by empty bins, so a borrowed value never equals a real one.
+_EMPTY_BIN_OFFSET = 1 << 64
+_WORD_RE = re.compile(r"[a-z']+|\d+")
+
+DEFAULT_NUM_PERM = 64
+DEFAULT_BANDS = 16
+DEFAULT_THRESHOLD = 0.85
+SHINGLE_SIZE = 3
+
+def normalize_conversation_text(data: List[Dict[str, Any]]) -> List[str]:
+    """
+    Lower-cases and tokenizes a conversation into words.
+
+    Every number is replaced with a placeholder so calls that differ only in amounts,
+    dates or phone numbers still hash alike.
+    """
+    words = []
+    for entry in data:
+        for word in _WORD_RE.findall(str(entry.get('text', '')).lower()):
+            words.append('#' if word[0].isdigit() else word)
+    return words
+
+def shingle_hashes(words: List[str], size: int = SHINGLE_SIZE) -> set:
+    """Stable 32-bit hashes of every `size`-word shingle (the whole text if it is shorter)."""
+    if len(words) < size:
+        return {zlib.crc32(' '.join(words).encode('utf-8'))} if words else set()
+    return {zlib.crc32(' '.join(words[i:i + size]).encode('utf-8')) for i in range(len(words) - size + 1)}
+
+class MinHasher:
+    """
+    Computes MinHash signatures by one-permutation hashing with a fixed seed.
+
+    Each shingle hash is scrambled once and dropped into one of `num_perm` bins, keeping the
+    minimum per bin, so a signature costs one pass over the shingles instead of one pass per
+    permutation. Empty bins borrow the next non-empty bin's value (rotation densification),
+    which keeps signatures usable for LSH banding. Signatures are comparable across runs.
+    """
+
+    def __init__(self, num_perm: int = DEFAULT_NUM_PERM, seed: int = 1):
+        self.num_perm = num_perm
+        self._seed = (seed * _GOLDEN) & _MASK64
+
+    def signature(self, hashes: Iterable[int]) -> Tuple[int, ...]:
+        n = self.num_perm
+        bins: List[Optional[int]] = [None] * n
+        for h in hashes:
+            # splitmix64 finalizer; the bin comes from the high bits via multiply-shift.
+            h = ((h ^ self._seed) * _GOLDEN) & _MASK64
+            h = ((h ^ (h >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+            h = ((h ^ (h >> 27)) * 0x94D049BB133111EB) & _MASK64
+            value = h ^ (h >> 31)
+            b = (value * n) >> 64
+            if bins[b] is None or value < bins[b]:
+                bins[b] = value
+
+        if all(value is None for value in bins):
+            return (0,) * n
+        signature = list(bins)
+        for i, value in enumerate(bins):
+            if value is None:
+                distance = 1
+                while bins[(i + distance) % n] is None:
+                    distance += 1
+                signature[i] = bins[(i + distance) % n] + distance * _EMPTY_BIN_OFFSET
+        return tuple(signature)
+
+def estimated_similarity(sig1: Tuple[int, ...], sig2: Tuple[int, ...]) -> float:
+    """Fraction of matching signature slots, an estimate of the Jaccard similarity."""
+    return sum(a == b for a, b in zip(sig1, sig2)) / len(sig1)
+
+class NearDuplicateIndex:
+    """
+    MinHash/LSH index of conversations for near-duplicate detection at ingestion.
+
+    Signatures are split into `bands` bands; two calls become candidates when any band matches
+    exactly, and a candidate is accepted when its estimated similarity reaches `threshold`. Only
+    the first call of each near-duplicate group is indexed, so later copies resolve to it.
+    """
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD, num_perm: int = DEFAULT_NUM_PERM,
+                 bands: int = DEFAULT_BANDS, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands.")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.hasher = MinHasher(num_perm, seed)
+        self._buckets: List[Dict[Tuple[int, ...], List[str]]] = [{} for _ in range(bands)]
+        self._signatures: Dict[str, Tuple[int, ...]] = {}
+        self.seen = 0
+        self.duplicates = 0
+
+    def signature(self, data: List[Dict[str, Any]]) -> Tuple[int, ...]:
+        return self.hasher.signature(shingle_hashes(normalize_conversation_text(data)))
+
+    def _bands(self, signature: Tuple[int, ...]) -> Iterator[Tuple[int, Tuple[int, ...]]]:
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows]
+
+    def query(self, signature: Tuple[int, ...]) -> Optional[Tuple[str, float]]:
+        """Returns (call_id, similarity) of the most similar indexed call above the threshold."""
+        candidates = set()
+        for band, key in self._bands(signature):
+            candidates.update(self._buckets[band].get(key, ()))
+        best = None
+        for call_id in candidates:
+            similarity = estimated_similarity(signature, self._signatures[call_id])
+            if similarity >= self.threshold and (best is None or similarity > best[1]):
+                best = (call_id, similarity)
+        return best
+
+    def add(self, call_id: str, data: List[Dict[str, Any]]) -> Optional[Tuple[str, float]]:
+        """
+        Checks a call against the index and indexes it if it is new.
+
+        Returns (original_call_id, similarity) when the call is a near-duplicate, else None.
+        """
+        signature = self.signature(data)
+        self.seen += 1
+        match = self.query(signature)
+        if match is not None:
+            self.duplicates += 1
+            return match
+        self._signatures[call_id] = signature
+        for band, key in self._bands(signature):
+            self._buckets[band].setdefault(key, []).append(call_id)
+        return None
+
+    @property
+    def dedup_rate(self) -> float:
+        return self.duplicates / self.seen if self.seen else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {'calls': self.seen, 'duplicates': self.duplicates,
+                'unique': self.seen - self.duplicates, 'dedup_rate': round(self.dedup_rate, 4)}
+
+def analyze_with_dedup(conversations: Iterable[Tuple[str, List[Dict[str, Any]]]],
+                       analyze: Callable[[List[Dict[str, Any]]], Any],
+                       index: Optional[NearDuplicateIndex] = None) -> Iterator[Tuple[str, Any, Optional[str]]]:
+    """
+    Runs `analyze` once per near-duplicate group and reuses its result for the copies.
+
+    Yields (call_id, result, duplicate_of) where `duplicate_of` is the call whose result was
+    reused, or None if the call was analyzed itself. `index.stats()` reports the dedup rate.
+    """
+    index = index or NearDuplicateIndex()
+    results: Dict[str, Any] = {}
+    for call_id, data in conversations:
+        match = index.add(call_id, data)
+        if match is not None:
+            yield call_id, results[match[0]], match[0]
+            continue
+        results[call_id] = analyze(data)
+        yield call_id, results[call_id], None
@@ -1,30 +1,80 @@
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Iterator, Optional
+from array import array
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-import itertools
+from transcript_validation import is_sorted_transcript
 
-def calculate_call_quality_metrics(data: List[Dict[str, Any]]) -> Dict[str, Any]:
+INTERVAL_MODES = ('list', 'compact', 'none')
+
+class SpeakingIntervals:
+    """
+    Compact, read-only view of a call's speaking intervals.
+
+    Start and end times live in float arrays and speakers in a byte array of codes, so a
+    view costs about 17 bytes per utterance instead of a dict each. Indexing and iteration
+    yield the same {'start', 'end', 'speaker'} dicts as the list form, built on demand.
+    """
+
+    def __init__(self, data: List[Dict[str, Any]]):
+        self.starts = array('d')
+        self.ends = array('d')
+        self.codes = array('B')
+        self.speakers: List[str] = []
+        codes: Dict[str, int] = {}
+        for entry in data:
+            speaker = entry.get('speaker', '').lower()
+            if speaker not in codes:
+                if len(self.speakers) > 0xFF:
+                    raise ValueError("Too many distinct speakers for a compact interval view.")
+                codes[speaker] = len(self.speakers)
+                self.speakers.append(speaker)
+            self.starts.append(entry.get('stime', 0))
+            self.ends.append(entry.get('etime', 0))
+            self.codes.append(codes[speaker])
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __getitem__(self, i: int) -> Dict[str, Any]:
+        return {'start': self.starts[i], 'end': self.ends[i], 'speaker': self.speakers[self.codes[i]]}
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for i in range(len(self.starts)):
+            yield self[i]
+
+def calculate_call_quality_metrics(data: List[Dict[str, Any]], intervals: str = 'list') -> Dict[str, Any]:
     """
     Calculates key call quality metrics from conversation data.
     
     This function processes a list of utterances to compute total duration, speaking times,
-    overtalk, and silence periods. It handles empty input data gracefully.
+    overtalk, and silence periods. It handles empty input data gracefully. Input that came
+    from normalize_transcript is already sorted by start time and is not sorted again.
+
+    `intervals` controls the "speaking_intervals" entry: 'list' (a list of dicts), 'compact'
+    (a SpeakingIntervals view) or 'none' (omitted, leaving only scalar fields; pass the data
+    to create_call_quality_visualizations instead).
     """
+    if intervals not in INTERVAL_MODES:
+        raise ValueError(f"Unknown intervals mode: {intervals}")
+
     if not data:
-        return {
+        metrics = {
             "total_duration": 0, "overtalk_percentage": 0, "silence_percentage": 0,
             "speaking_time": 0, "agent_speaking_time": 0, "customer_speaking_time": 0,
-            "speaking_intervals": []
+            "overtalk_duration": 0, "silence_duration": 0,
         }
+        if intervals != 'none':
+            metrics["speaking_intervals"] = [] if intervals == 'list' else SpeakingIntervals([])
+        return metrics
 
-    # Calculate speaking intervals and individual talk times in one pass
-    speaking_intervals = []
+    # Collect (start, end, speaker) tuples and individual talk times in one pass
+    spans = []
     agent_time = 0
     customer_time = 0
     for entry in data:
         start, end = entry.get('stime', 0), entry.get('etime', 0)
         speaker = entry.get('speaker', '').lower()
-        speaking_intervals.append({'start': start, 'end': end, 'speaker': speaker})
+        spans.append((start, end, speaker))
         
         duration = end - start
         if speaker == 'agent':
@@ -33,20 +83,25 @@ def calculate_call_quality_metrics(data: List[Dict[str, Any]]) -> Dict[str, Any]
             customer_time += duration
     
     total_speaking_time = agent_time + customer_time
-    total_duration = max(entry['end'] for entry in speaking_intervals) if speaking_intervals else 0
+    total_duration = max(end for _, end, _ in spans)
 
-    # Calculate overtalk duration more concisely using itertools
+    # Calculate overtalk with a sweep over intervals sorted by start: an interval can only
+    # overlap the ones that start before it ends, so the inner loop stops early.
+    ordered = spans if is_sorted_transcript(data) else sorted(spans, key=lambda span: span[0])
     overtalk_duration = 0
-    for interval1, interval2 in itertools.combinations(speaking_intervals, 2):
-        if interval1['speaker'] != interval2['speaker']:
-            overlap_start = max(interval1['start'], interval2['start'])
-            overlap_end = min(interval1['end'], interval2['end'])
-            if overlap_start < overlap_end:
-                overtalk_duration += (overlap_end - overlap_start)
+    for i, (start1, end1, speaker1) in enumerate(ordered):
+        for j in range(i + 1, len(ordered)):
+            start2, end2, speaker2 = ordered[j]
+            if start2 >= end1:
+                break
+            if speaker1 != speaker2:
+                overlap_end = min(end1, end2)
+                if start2 < overlap_end:
+                    overtalk_duration += (overlap_end - start2)
 
     silence_duration = total_duration - total_speaking_time + overtalk_duration
 
-    return {
+    metrics = {
         "total_duration": total_duration,
         "speaking_time": total_speaking_time,
         "agent_speaking_time": agent_time,
@@ -55,11 +110,21 @@ def calculate_call_quality_metrics(data: List[Dict[str, Any]]) -> Dict[str, Any]
         "silence_duration": max(0, silence_duration),
         "overtalk_percentage": round((overtalk_duration / total_duration * 100) if total_duration > 0 else 0, 2),
         "silence_percentage": round((silence_duration / total_duration * 100) if total_duration > 0 else 0, 2),
-        "speaking_intervals": speaking_intervals
     }
+    if intervals == 'list':
+        metrics["speaking_intervals"] = [{'start': start, 'end': end, 'speaker': speaker} for start, end, speaker in spans]
+    elif intervals == 'compact':
+        metrics["speaking_intervals"] = SpeakingIntervals(data)
+    return metrics
 
-def create_call_quality_visualizations(metrics: Dict[str, Any]) -> go.Figure:
-    """Creates a 2x2 dashboard of call quality visualizations."""
+def create_call_quality_visualizations(metrics: Dict[str, Any],
+                                       data: Optional[List[Dict[str, Any]]] = None) -> go.Figure:
+    """
+    Creates a 2x2 dashboard of call quality visualizations.
+
+    If the metrics were calculated without speaking intervals, pass the conversation `data`
+    and a compact interval view is built from it just for the timeline.
+    """
     fig = make_subplots(
         rows=2, cols=2,
         subplot_titles=('Call Composition', 'Speaking Timeline', 'Quality Metrics', 'Speaker Distribution'),
@@ -78,7 +143,10 @@ def create_call_quality_visualizations(metrics: Dict[str, Any]) -> go.Figure:
     fig.add_trace(go.Pie(labels=comp_labels, values=comp_values, marker_colors=['#2E8B57', '#FFB6C1', '#FF6B6B']), row=1, col=1)
 
     # 2. Speaking Timeline
-    for interval in metrics.get('speaking_intervals', []):
+    intervals = metrics.get('speaking_intervals')
+    if intervals is None:
+        intervals = SpeakingIntervals(data) if data else []
+    for interval in intervals:
         speaker = 'agent' if 'agent' in interval.get('speaker', '') else 'customer'
         fig.add_trace(go.Scatter(
             x=[interval['start'], interval['end']], y=[speaker, speaker],
@@ -0,0 +1,112 @@
+from typing import Dict, List, Any, Callable, Optional
+
+from analysis_functions import DEFAULT_DICTIONARY, analyze_profanity_pattern
+from keyword_dictionaries import KeywordDictionary, KeywordIndex
+
+VOICEMAIL_PHRASES = {
+    'voicemail', 'voice mail', 'leave a message', 'leave your message', 'after the beep', 'after the tone',
+    'not available to take your call', 'unable to take your call', "can't take your call",
+    'cannot take your call', 'mailbox', 'record your message', "i'll return it", 'return your call',
+}
+NO_ANSWER_PHRASES = {
+    'the number you have dialed', 'the number you dialed', 'not in service', 'has been disconnected',
+    'no longer in service', 'please try your call again', 'please try again later',
+    'the person you are calling', 'the subscriber you', 'is not available at this time',
+}
+# Only phrases a debtor would not use to dispute a debt ("never heard of this debt",
+# "you have the wrong amount" are ordinary live-call language).
+WRONG_PARTY_PHRASES = {
+    'wrong number', 'wrong person', "there's no one here by that name", 'no one here by that name',
+    "doesn't live here", 'does not live here', 'no longer lives here',
+}
+
+# A voicemail greeting must come within this many customer turns, and a real
+# conversation has more customer turns than a machine greeting ever does. Wrong-party
+# calls end just as quickly once the callee has said so.
+GREETING_TURNS = 2
+MAX_VOICEMAIL_CUSTOMER_TURNS = 4
+WRONG_PARTY_TURNS = 3
+MAX_WRONG_PARTY_CUSTOMER_TURNS = 4
+
+_VOICEMAIL_INDEX = KeywordIndex(VOICEMAIL_PHRASES)
+_NO_ANSWER_INDEX = KeywordIndex(NO_ANSWER_PHRASES)
+_WRONG_PARTY_INDEX = KeywordIndex(WRONG_PARTY_PHRASES)
+
+def classify_call(data: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Tags a call as 'voicemail', 'no_answer', 'wrong_party' or 'live' before full analysis.
+
+    Only the first few customer turns are matched against small phrase indexes; the rest of
+    the transcript contributes turn counts alone, so the cost stays tiny for long calls.
+    """
+    customer_turns = 0
+    agent_turns = 0
+    voicemail_hit = None
+    no_answer_hit = None
+    wrong_party_hit = None
+    for entry in data:
+        if 'agent' in entry.get('speaker', '').lower():
+            agent_turns += 1
+            continue
+        customer_turns += 1
+        if customer_turns > max(GREETING_TURNS, WRONG_PARTY_TURNS):
+            continue
+        text = entry.get('text', '').lower()
+        if customer_turns <= GREETING_TURNS:
+            voicemail_hit = voicemail_hit or (_VOICEMAIL_INDEX.find(text) or None)
+            no_answer_hit = no_answer_hit or (_NO_ANSWER_INDEX.find(text) or None)
+        if customer_turns <= WRONG_PARTY_TURNS:
+            wrong_party_hit = wrong_party_hit or (_WRONG_PARTY_INDEX.find(text) or None)
+
+    stats = {'agent_turns': agent_turns, 'customer_turns': customer_turns}
+    if customer_turns == 0:
+        return {'category': 'no_answer', 'reason': 'No customer speech.', 'stats': stats}
+    if no_answer_hit and customer_turns <= MAX_VOICEMAIL_CUSTOMER_TURNS:
+        return {'category': 'no_answer', 'reason': f"Carrier message: {', '.join(no_answer_hit)}", 'stats': stats}
+    if voicemail_hit and customer_turns <= MAX_VOICEMAIL_CUSTOMER_TURNS:
+        return {'category': 'voicemail', 'reason': f"Voicemail greeting: {', '.join(voicemail_hit)}", 'stats': stats}
+    if wrong_party_hit and customer_turns <= MAX_WRONG_PARTY_CUSTOMER_TURNS:
+        return {'category': 'wrong_party', 'reason': f"Callee said: {', '.join(wrong_party_hit)}", 'stats': stats}
+    return {'category': 'live', 'reason': 'Live conversation.', 'stats': stats}
+
+def reduced_analysis(data: List[Dict[str, Any]], triage: Dict[str, Any],
+                     dictionary: Optional[KeywordDictionary] = None) -> Dict[str, Any]:
+    """
+    The cut-down analysis for non-live calls: checks what the agent disclosed, plus profanity.
+
+    On voicemail and wrong-party calls nobody on the line is a verified debtor, so anything
+    sensitive the agent says, before or after the callee reveals who they are, reaches a third
+    party and is reported as a disclosure violation.
+    """
+    agent_profanity, customer_profanity, profanity_details = analyze_profanity_pattern(data, dictionary)
+    sensitive = (dictionary or DEFAULT_DICTIONARY).sensitive
+    disclosures = []
+    for entry in data:
+        if 'agent' not in entry.get('speaker', '').lower():
+            continue
+        matched = sensitive.find(entry.get('text', '').lower())
+        if matched:
+            disclosures.append({
+                'text': entry.get('text', ''),
+                'timestamp': f"{entry.get('stime', 0)}s - {entry.get('etime', 0)}s",
+                'keywords_found': matched,
+            })
+    return {
+        'triage': triage,
+        'profanity': {'agent': agent_profanity, 'customer': customer_profanity, 'details': profanity_details},
+        'disclosure_violation': bool(disclosures),
+        'disclosures': disclosures,
+    }
+
+def route_call(data: List[Dict[str, Any]], full_analysis: Callable[[List[Dict[str, Any]]], Any],
+               dictionary: Optional[KeywordDictionary] = None) -> Dict[str, Any]:
+    """
+    Classifies a call and sends it down the matching path.
+
+    Live calls get `full_analysis(data)` under 'result'; voicemail, no-answer and wrong-party
+    calls only get reduced_analysis, skipping compliance rules and LLM work.
+    """
+    triage = classify_call(data)
+    if triage['category'] == 'live':
+        return {'triage': triage, 'result': full_analysis(data)}
+    return reduced_analysis(data, triage, dictionary)
@@ -0,0 +1,258 @@
+import weakref
+from typing import Dict, List, Any, Iterable, Optional, Tuple
+
+from analysis_functions import SENSITIVE_KEYWORDS, VERIFICATION_KEYWORDS
+from keyword_dictionaries import KeywordDictionary, KeywordIndex
+
+# Named keyword sets that rules refer to. Rules only ever name a set, so the same set can be
+# shared by many rules and is matched once per utterance regardless of how many use it.
+DEFAULT_TERM_SETS = {
+    'sensitive': SENSITIVE_KEYWORDS,
+    'verification': VERIFICATION_KEYWORDS,
+    'debt_disclosure': {
+        'debt', 'debts', 'balance', 'owe', 'owed', 'outstanding', 'past due', 'payment', 'payments',
+    },
+    'mini_miranda': {
+        'attempt to collect a debt', 'debt collector', 'information obtained will be used',
+    },
+    'third_party': {
+        'wrong person', 'wrong number', 'not me', "doesn't live here", 'does not live here',
+        'no longer lives here', "there's no one here by that name", 'you have the wrong',
+    },
+    'cease_and_desist': {
+        'stop calling', 'do not call', "don't call", 'cease and desist', 'cease communication',
+        'stop contacting', 'represented by an attorney', 'talk to my lawyer',
+    },
+}
+
+# How each term set is matched, as in keyword_dictionaries.CATEGORY_MODES. Short phrases such as
+# 'owe' or 'not me' would otherwise fire inside "however" or "cannot meet"; sets not listed here
+# match as substrings.
+TERM_SET_MODES = {
+    'debt_disclosure': 'word',
+    'third_party': 'word',
+    'cease_and_desist': 'word',
+}
+
+# Rule types:
+#   forbidden        - `terms` said by `speaker` (optionally only inside `window` seconds) is a violation
+#   forbidden_before - `terms` said by `speaker` before any `until` said by `until_speaker` is a violation
+#   forbidden_after  - `terms` said by `speaker` after `trigger` said by `trigger_speaker`
+#                      (optionally only within `within` seconds of it) is a violation
+#   required_within  - `terms` must be said by `speaker` within the first `within` seconds of the call
+# `speaker` is 'agent', 'customer' or 'any'; set fields accept a set name or a list of names.
+# `window` is a [start, end] pair of seconds and `within` a number of seconds.
+DEFAULT_RULES = [
+    {
+        'id': 'sensitive_before_verification', 'type': 'forbidden_before',
+        'description': 'Sensitive information shared before identity verification',
+        'speaker': 'agent', 'terms': 'sensitive', 'until': 'verification',
+    },
+    {
+        'id': 'mini_miranda_disclosure', 'type': 'required_within',
+        'description': 'Mini-Miranda disclosure not given in the first 30 seconds',
+        'speaker': 'agent', 'terms': 'mini_miranda', 'within': 30,
+    },
+    {
+        'id': 'third_party_disclosure', 'type': 'forbidden_after',
+        'description': 'Debt discussed after the callee indicated they are not the debtor',
+        'speaker': 'agent', 'terms': 'debt_disclosure',
+        'trigger_speaker': 'customer', 'trigger': 'third_party',
+    },
+    {
+        'id': 'cease_and_desist', 'type': 'forbidden_after',
+        'description': 'Collection continued after a request to stop contact',
+        'speaker': 'agent', 'terms': 'debt_disclosure',
+        'trigger_speaker': 'customer', 'trigger': 'cease_and_desist',
+    },
+]
+
+RULE_TYPES = {'forbidden', 'forbidden_before', 'forbidden_after', 'required_within'}
+SPEAKERS = {'agent', 'customer', 'any'}
+
+def _speaker_matches(expected: str, is_agent: bool) -> bool:
+    return expected == 'any' or (expected == 'agent') == is_agent
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def _format_timestamp(entry: Dict[str, Any]) -> str:
+    return f"{entry.get('stime', 0)}s - {entry.get('etime', 0)}s"
+
+class ComplianceRuleEngine:
+    """
+    Evaluates many declarative compliance rules in a single pass over a transcript.
+
+    Every keyword of every referenced set goes into one shared KeywordIndex per matching mode
+    (see TERM_SET_MODES), so each utterance is scanned at most twice no matter how many rules
+    exist. Hits are mapped back to set names and only the rules subscribed to those sets are
+    updated; utterances without any hit cost only the scans. With a `dictionary`, e.g. a
+    per-client one from KeywordDictionaryStore, its sensitive and verification keywords replace
+    the built-in sets of those names.
+    """
+
+    def __init__(self, rules: Iterable[Dict[str, Any]] = DEFAULT_RULES,
+                 term_sets: Optional[Dict[str, Iterable[str]]] = None,
+                 set_modes: Optional[Dict[str, str]] = None,
+                 dictionary: Optional[KeywordDictionary] = None):
+        term_sets = dict(DEFAULT_TERM_SETS if term_sets is None else term_sets)
+        set_modes = dict(TERM_SET_MODES if set_modes is None else set_modes)
+        if dictionary is not None:
+            for name in ('sensitive', 'verification'):
+                index = dictionary.get(name)
+                term_sets[name] = index.keywords
+                set_modes[name] = index.mode
+        self.rules = [self._validate(rule, term_sets) for rule in rules]
+
+        used_sets = {name for rule in self.rules for role in ('terms', 'until', 'trigger') for name in rule.get(role, ())}
+        keyword_sets: Dict[str, Dict[str, set]] = {}
+        for name in used_sets:
+            by_keyword = keyword_sets.setdefault(set_modes.get(name, 'substring'), {})
+            for keyword in term_sets[name]:
+                by_keyword.setdefault(keyword.strip().lower(), set()).add(name)
+        # [(index, keyword -> set names)] for each matching mode in use
+        self._indexes = []
+        for mode, by_keyword in sorted(keyword_sets.items()):
+            sets_by_keyword = {kw: frozenset(names) for kw, names in by_keyword.items()}
+            self._indexes.append((KeywordIndex(sets_by_keyword, mode), sets_by_keyword))
+
+        # set name -> [(rule position, role)], so a hit only touches the rules that care about it
+        self._subscribers: Dict[str, List[Tuple[int, str]]] = {}
+        for position, rule in enumerate(self.rules):
+            for role in ('terms', 'until', 'trigger'):
+                for name in rule.get(role, ()):
+                    self._subscribers.setdefault(name, []).append((position, role))
+
+    @staticmethod
+    def _validate(rule: Dict[str, Any], term_sets: Dict[str, Iterable[str]]) -> Dict[str, Any]:
+        rule = dict(rule)
+        rule_id = rule.get('id')
+        if not rule_id:
+            raise ValueError("Every compliance rule needs an 'id'.")
+        if rule.get('type') not in RULE_TYPES:
+            raise ValueError(f"Rule '{rule_id}' has unknown type {rule.get('type')!r}.")
+
+        required = {'forbidden_before': ('terms', 'until'), 'forbidden_after': ('terms', 'trigger')}
+        for role in ('terms',) + required.get(rule['type'], ()):
+            if role not in rule:
+                raise ValueError(f"Rule '{rule_id}' is missing '{role}'.")
+        if rule['type'] == 'required_within' and 'within' not in rule:
+            raise ValueError(f"Rule '{rule_id}' is missing 'within'.")
+        if 'within' in rule and (not _is_number(rule['within']) or rule['within'] < 0):
+            raise ValueError(f"Rule '{rule_id}' has 'within' {rule['within']!r}; expected a non-negative number of seconds.")
+        if 'window' in rule:
+            window = rule['window']
+            if (not isinstance(window, (list, tuple)) or len(window) != 2
+                    or not all(_is_number(bound) for bound in window) or window[0] > window[1]):
+                raise ValueError(f"Rule '{rule_id}' has 'window' {window!r}; expected [start, end] in seconds.")
+            rule['window'] = tuple(window)
+
+        for role in ('terms', 'until', 'trigger'):
+            if role in rule:
+                names = [rule[role]] if isinstance(rule[role], str) else list(rule[role])
+                unknown = [name for name in names if name not in term_sets]
+                if unknown:
+                    raise ValueError(f"Rule '{rule_id}' refers to unknown term sets: {', '.join(unknown)}")
+                rule[role] = tuple(names)
+
+        rule.setdefault('speaker', 'agent')
+        rule.setdefault('until_speaker', rule['speaker'])
+        rule.setdefault('trigger_speaker', 'any')
+        for field in ('speaker', 'until_speaker', 'trigger_speaker'):
+            if rule[field] not in SPEAKERS:
+                raise ValueError(f"Rule '{rule_id}' has unknown {field} {rule[field]!r}.")
+        return rule
+
+    def evaluate(self, data: List[Dict[str, Any]]) -> Dict[str, List[Dict]]:
+        """Returns violation details per rule id; rules without violations map to an empty list."""
+        results: Dict[str, List[Dict]] = {rule['id']: [] for rule in self.rules}
+        cleared = [False] * len(self.rules)          # forbidden_before: `until` seen
+        armed_at: List[Optional[float]] = [None] * len(self.rules)  # forbidden_after: trigger time
+        satisfied = [False] * len(self.rules)        # required_within: terms seen in window
+
+        for entry in data:
+            text = entry.get('text', '').lower()
+            hits: Dict[str, List[str]] = {}
+            for index, sets_by_keyword in self._indexes:
+                for keyword in index.find(text):
+                    for name in sets_by_keyword[keyword]:
+                        hits.setdefault(name, []).append(keyword)
+            if not hits:
+                continue
+
+            is_agent = 'agent' in entry.get('speaker', '').lower()
+            stime = entry.get('stime', 0)
+
+            # Group this utterance's hits by rule and role.
+            touched: Dict[int, Dict[str, List[str]]] = {}
+            for name, found in hits.items():
+                for position, role in self._subscribers.get(name, ()):
+                    touched.setdefault(position, {}).setdefault(role, []).extend(found)
+
+            for position, roles in touched.items():
+                rule = self.rules[position]
+                kind = rule['type']
+
+                # A verification in the same utterance clears it, as in analyze_compliance_pattern.
+                if kind == 'forbidden_before' and 'until' in roles and _speaker_matches(rule['until_speaker'], is_agent):
+                    cleared[position] = True
+
+                terms = roles.get('terms')
+                if terms and _speaker_matches(rule['speaker'], is_agent):
+                    violated = False
+                    if kind == 'forbidden':
+                        window = rule.get('window')
+                        violated = window is None or window[0] <= stime <= window[1]
+                    elif kind == 'forbidden_before':
+                        violated = not cleared[position]
+                    elif kind == 'forbidden_after':
+                        within = rule.get('within')
+                        violated = armed_at[position] is not None and (within is None or stime - armed_at[position] <= within)
+                    elif kind == 'required_within' and stime <= rule['within']:
+                        satisfied[position] = True
+
+                    if violated:
+                        results[rule['id']].append({
+                            'rule': rule['id'],
+                            'text': entry.get('text', ''),
+                            'timestamp': _format_timestamp(entry),
+                            'keywords_found': list(dict.fromkeys(terms)),
+                        })
+
+                # The triggering utterance itself is not "after" the trigger.
+                if kind == 'forbidden_after' and 'trigger' in roles and _speaker_matches(rule['trigger_speaker'], is_agent):
+                    armed_at[position] = stime
+
+        for position, rule in enumerate(self.rules):
+            if rule['type'] == 'required_within' and not satisfied[position] and data:
+                results[rule['id']].append({
+                    'rule': rule['id'],
+                    'text': rule.get('description', ''),
+                    'timestamp': f"0s - {rule['within']}s",
+                    'keywords_found': [],
+                })
+        return results
+
+_default_engine: Optional[ComplianceRuleEngine] = None
+# One engine per loaded dictionary, dropped when a store swaps the dictionary out.
+_dictionary_engines = weakref.WeakKeyDictionary()
+
+def evaluate_compliance_rules(data: List[Dict[str, Any]], engine: Optional[ComplianceRuleEngine] = None,
+                              dictionary: Optional[KeywordDictionary] = None) -> Tuple[bool, Dict[str, List[Dict]]]:
+    """
+    Runs all compliance rules over a conversation and reports whether any were violated.
+
+    Without an `engine`, the default rules run with `dictionary`'s sensitive and verification
+    keywords, or the built-in ones.
+    """
+    global _default_engine
+    if engine is None and dictionary is not None:
+        engine = _dictionary_engines.get(dictionary)
+        if engine is None:
+            engine = _dictionary_engines[dictionary] = ComplianceRuleEngine(dictionary=dictionary)
+    if engine is None:
+        if _default_engine is None:
+            _default_engine = ComplianceRuleEngine()
+        engine = _default_engine
+    results = engine.evaluate(data)
+    return any(results.values()), results
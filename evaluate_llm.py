@@ -0,0 +1,211 @@
+import json
+import time
+from typing import Dict, List, Tuple, Any, Iterable, Optional
+
+from analysis_functions import analyze_profanity_pattern, analyze_compliance_pattern, analyze_with_llm
+from call_dedup import NearDuplicateIndex
+from call_triage import route_call
+from transcript_validation import normalize_transcript, reject_call, TranscriptValidationError
+
+# Gemini 2.0 Flash list prices in USD per million tokens; override for other models.
+DEFAULT_INPUT_PRICE = 0.10
+DEFAULT_OUTPUT_PRICE = 0.40
+
+ENTITIES = ('Profanity Detection', 'Privacy and Compliance Violation')
+
+def _pattern_flags(entity: str, data: List[Dict[str, Any]]) -> Dict[str, bool]:
+    """Pattern results keyed by the LLM schema fields they correspond to."""
+    if entity == 'Profanity Detection':
+        agent_profanity, customer_profanity, _ = analyze_profanity_pattern(data)
+        return {'agent_profanity': agent_profanity, 'customer_profanity': customer_profanity}
+    violation, _ = analyze_compliance_pattern(data)
+    return {'compliance_violation': violation}
+
+def _reduced_flags(entity: str, reduced: Dict[str, Any]) -> Dict[str, bool]:
+    """_pattern_flags for a call that call_triage sent down the reduced path."""
+    if entity == 'Profanity Detection':
+        return {'agent_profanity': reduced['profanity']['agent'], 'customer_profanity': reduced['profanity']['customer']}
+    return {'compliance_violation': reduced['disclosure_violation']}
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+def evaluate_calls(conversations: Iterable[Tuple[str, List[Dict[str, Any]]]], model: Any,
+                   entities: Iterable[str] = ENTITIES,
+                   input_price: float = DEFAULT_INPUT_PRICE,
+                   output_price: float = DEFAULT_OUTPUT_PRICE,
+                   dedup: Optional[NearDuplicateIndex] = None, triage: bool = False,
+                   rejected: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """
+    Runs the pattern analyzers and analyze_with_llm over a corpus and compares them.
+
+    `model` is a RecordingModel or ReplayModel from llm_replay.py; its usage counters supply
+    the per-call token estimates and recorded latency. With a `dedup` index, near-duplicate
+    calls reuse the first call's results at no LLM cost. With `triage`, calls go through
+    call_triage.route_call first: voicemail, no-answer and wrong-party calls get the reduced
+    profanity and disclosure check instead of the full pattern and LLM analysis, and are left
+    out of agreement. Calls that fail normalize_transcript are skipped and listed under
+    'rejected', together with any entries already in `rejected`.
+    Returns a report with per-call rows and per-entity agreement, latency and cost summaries.
+    """
+    entities = list(entities)
+    rejected = [] if rejected is None else rejected
+    rows = []
+    rows_by_call: Dict[str, List[Dict[str, Any]]] = {}
+    for call_id, data in conversations:
+        try:
+            data = normalize_transcript(data)
+        except TranscriptValidationError as e:
+            reject_call(rejected, str(call_id), str(e))
+            continue
+        match = dedup.add(call_id, data) if dedup is not None else None
+        if match is not None:
+            for original in rows_by_call[match[0]]:
+                rows.append(dict(original, call_id=call_id, duplicate_of=match[0], pattern_latency=0.0,
+                                 llm_latency=0.0, requests=0, input_tokens=0, output_tokens=0, cost=0.0))
+            continue
+
+        def full_analysis(data):
+            call_rows = []
+            for entity in entities:
+                model.reset_usage()
+                start = time.perf_counter()
+                pattern = _pattern_flags(entity, data)
+                pattern_latency = time.perf_counter() - start
+
+                start = time.perf_counter()
+                llm = analyze_with_llm(data, entity, "", model=model)
+                wall_latency = time.perf_counter() - start
+
+                row = {
+                    'call_id': call_id,
+                    'entity': entity,
+                    'pattern': pattern,
+                    'llm': {field: llm.get(field) for field in pattern},
+                    'error': llm.get('error'),
+                    'duplicate_of': None,
+                    'triage': 'live' if triage else None,
+                    'pattern_latency': pattern_latency,
+                    'llm_latency': model.latency or wall_latency,
+                    'requests': model.requests,
+                    'input_tokens': model.input_tokens,
+                    'output_tokens': model.output_tokens,
+                }
+                row['cost'] = (row['input_tokens'] * input_price + row['output_tokens'] * output_price) / 1_000_000
+                call_rows.append(row)
+            return call_rows
+
+        if triage:
+            routed = route_call(data, full_analysis)
+            call_rows = routed['result'] if 'result' in routed else [
+                {'call_id': call_id, 'entity': entity, 'pattern': _reduced_flags(entity, routed), 'llm': {}, 'error': None,
+                 'duplicate_of': None, 'triage': routed['triage']['category'],
+                 'disclosure_violation': routed['disclosure_violation'], 'pattern_latency': 0.0,
+                 'llm_latency': 0.0, 'requests': 0, 'input_tokens': 0, 'output_tokens': 0, 'cost': 0.0}
+                for entity in entities]
+        else:
+            call_rows = full_analysis(data)
+        rows_by_call[call_id] = call_rows
+        rows.extend(call_rows)
+
+    summary = {}
+    for entity in entities:
+        entity_rows = [r for r in rows if r['entity'] == entity]
+        analyzed_rows = [r for r in entity_rows if r['triage'] in (None, 'live')]
+        ok_rows = [r for r in analyzed_rows if not r['error']]
+        fields = {}
+        for field in (ok_rows[0]['pattern'] if ok_rows else {}):
+            both = sum(r['pattern'][field] and r['llm'][field] for r in ok_rows)
+            pattern_only = sum(r['pattern'][field] and not r['llm'][field] for r in ok_rows)
+            llm_only = sum(not r['pattern'][field] and r['llm'][field] for r in ok_rows)
+            neither = len(ok_rows) - both - pattern_only - llm_only
+            fields[field] = {
+                'agreement': round((both + neither) / len(ok_rows), 4),
+                'both': both, 'pattern_only': pattern_only, 'llm_only': llm_only, 'neither': neither,
+            }
+        llm_latencies = [r['llm_latency'] for r in analyzed_rows if r['duplicate_of'] is None]
+        summary[entity] = {
+            'calls': len(entity_rows),
+            'errors': len(analyzed_rows) - len(ok_rows),
+            'triaged': len(entity_rows) - len(analyzed_rows),
+            'duplicates': sum(r['duplicate_of'] is not None for r in entity_rows),
+            'fields': fields,
+            'llm_latency_mean': sum(llm_latencies) / len(llm_latencies) if llm_latencies else 0.0,
+            'llm_latency_p50': _percentile(llm_latencies, 50),
+            'llm_latency_p95': _percentile(llm_latencies, 95),
+            'pattern_latency_mean': (sum(r['pattern_latency'] for r in analyzed_rows) / len(llm_latencies)) if llm_latencies else 0.0,
+            'requests': sum(r['requests'] for r in entity_rows),
+            'input_tokens': sum(r['input_tokens'] for r in entity_rows),
+            'output_tokens': sum(r['output_tokens'] for r in entity_rows),
+            'cost': round(sum(r['cost'] for r in entity_rows), 6),
+        }
+    report = {'summary': summary, 'calls': rows, 'rejected': rejected}
+    if dedup is not None:
+        report['dedup'] = dedup.stats()
+    return report
+
+def format_summary(report: Dict[str, Any]) -> str:
+    """Formats the report summary as plain text for the terminal."""
+    lines = []
+    for entity, s in report['summary'].items():
+        lines.append(f"== {entity}: {s['calls']} calls, {s['errors']} errors, {s['duplicates']} near-duplicates reused, "
+                     f"{s['triaged']} triaged as non-live")
+        for field, f in s['fields'].items():
+            lines.append(f"   {field}: {f['agreement'] * 100:.1f}% agreement "
+                         f"(both {f['both']}, pattern only {f['pattern_only']}, "
+                         f"LLM only {f['llm_only']}, neither {f['neither']})")
+        lines.append(f"   LLM latency: mean {s['llm_latency_mean']:.3f}s, p50 {s['llm_latency_p50']:.3f}s, "
+                     f"p95 {s['llm_latency_p95']:.3f}s; pattern mean {s['pattern_latency_mean'] * 1000:.3f}ms")
+        lines.append(f"   {s['requests']} requests, ~{s['input_tokens']} input / ~{s['output_tokens']} output tokens, "
+                     f"~${s['cost']:.4f}")
+    if report.get('rejected'):
+        lines.append(f"Skipped {len(report['rejected'])} invalid calls")
+    if 'dedup' in report:
+        d = report['dedup']
+        lines.append(f"Dedup: {d['duplicates']} of {d['calls']} calls were near-duplicates ({d['dedup_rate'] * 100:.1f}%)")
+    return "\n".join(lines)
+
+if __name__ == "__main__":
+    import argparse
+    import os
+    from llm_replay import make_model
+    from transcript_cache import iter_conversations_from_zip, TranscriptCache
+
+    parser = argparse.ArgumentParser(description="Compare LLM and pattern analysis over a corpus with recorded responses.")
+    parser.add_argument("source", help="Zip of JSON/YAML conversations or a packed transcript cache")
+    parser.add_argument("--mode", choices=("record", "replay"), default="replay")
+    parser.add_argument("--store", default="llm_recordings", help="Directory of recorded responses")
+    parser.add_argument("--entity", choices=ENTITIES, action="append", help="Limit to one entity (repeatable)")
+    parser.add_argument("--limit", type=int, default=None, help="Only evaluate the first N calls")
+    parser.add_argument("--input-price", type=float, default=DEFAULT_INPUT_PRICE, help="USD per million input tokens")
+    parser.add_argument("--output-price", type=float, default=DEFAULT_OUTPUT_PRICE, help="USD per million output tokens")
+    parser.add_argument("--dedup", action="store_true", help="Reuse results for near-duplicate calls")
+    parser.add_argument("--triage", action="store_true", help="Skip LLM analysis for voicemail, no-answer and wrong-party calls")
+    parser.add_argument("--output", help="Write the full JSON report here")
+    args = parser.parse_args()
+
+    model = make_model(args.mode, args.store, os.environ.get("GEMINI_API_KEY", ""))
+    dedup = NearDuplicateIndex() if args.dedup else None
+
+    def limited(conversations):
+        for i, item in enumerate(conversations):
+            if args.limit is not None and i >= args.limit:
+                break
+            yield item
+
+    rejected = []
+    if args.source.endswith('.zip'):
+        report = evaluate_calls(limited(iter_conversations_from_zip(args.source, rejected)), model,
+                                args.entity or ENTITIES, args.input_price, args.output_price, dedup, args.triage, rejected)
+    else:
+        with TranscriptCache(args.source) as cache:
+            report = evaluate_calls(limited(cache.iter_calls()), model,
+                                    args.entity or ENTITIES, args.input_price, args.output_price, dedup, args.triage, rejected)
+
+    print(format_summary(report))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as fh:
+            json.dump(report, fh, indent=2)
@@ -0,0 +1,275 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Any, Iterable, Optional, Tuple
+
+import yaml
+
+# Bump when the compiled index format changes so stale on-disk caches are rebuilt.
+INDEX_VERSION = 1
+DICTIONARY_EXTENSIONS = ('.yaml', '.yml', '.json')
+CACHE_DIR_NAME = '.index_cache'
+
+logger = logging.getLogger(__name__)
+
+# How each dictionary category is matched against lower-cased utterance text.
+# 'word' keywords must sit on word boundaries, 'substring' keywords match anywhere.
+CATEGORY_MODES = {
+    'profanity': 'word',
+    'sensitive': 'substring',
+    'verification': 'substring',
+}
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == '_'
+
+def _build_trie(keywords: Iterable[str]) -> Dict[str, Any]:
+    trie: Dict[str, Any] = {}
+    for keyword in keywords:
+        node = trie
+        for ch in keyword:
+            node = node.setdefault(ch, {})
+        node[''] = True
+    return trie
+
+def _trie_to_regex(node: Dict[str, Any]) -> str:
+    """Renders a character trie as a regex that never backtracks across sibling keywords."""
+    terminal = '' in node
+    branches = [re.escape(ch) + _trie_to_regex(child) for ch, child in sorted(node.items()) if ch]
+    if not branches:
+        return ''
+    body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+    if terminal:
+        return body + '?' if len(branches) == 1 and len(branches[0]) == 1 else f'(?:{body})?'
+    return body
+
+class KeywordIndex:
+    """
+    A precompiled matcher for one keyword category.
+
+    All keywords are folded into a single trie-shaped regex evaluated with a lookahead at
+    every position, which yields the longest keyword starting there. Shorter keywords that
+    are prefixes of it are looked up in a precomputed table, so every keyword occurrence is
+    reported while the per-utterance cost does not grow with the dictionary size.
+    """
+
+    def __init__(self, keywords: Iterable[str], mode: str = 'substring',
+                 pattern: Optional[str] = None, prefixes: Optional[Dict[str, List[str]]] = None):
+        if mode not in ('word', 'substring'):
+            raise ValueError(f"Unknown keyword matching mode: {mode}")
+        self.mode = mode
+        self.keywords = frozenset(kw.strip().lower() for kw in keywords if kw and kw.strip())
+        if pattern is None or prefixes is None:
+            pattern, prefixes = self._compile(self.keywords, mode)
+        self.pattern = pattern
+        self.prefixes = prefixes
+        self._regex = re.compile(pattern) if self.keywords else None
+
+    @staticmethod
+    def _compile(keywords: frozenset, mode: str) -> Tuple[str, Dict[str, List[str]]]:
+        body = _trie_to_regex(_build_trie(keywords))
+        pattern = rf'(?=\b({body})\b)' if mode == 'word' else f'(?=({body}))'
+
+        prefixes: Dict[str, List[str]] = {}
+        for keyword in keywords:
+            found = [keyword]
+            for i in range(1, len(keyword)):
+                candidate = keyword[:i]
+                if candidate not in keywords:
+                    continue
+                if mode == 'word' and _is_word_char(keyword[i - 1]) == _is_word_char(keyword[i]):
+                    continue
+                found.append(candidate)
+            prefixes[keyword] = found
+        return pattern, prefixes
+
+    def find(self, text: str) -> List[str]:
+        """Returns the distinct keywords found in already lower-cased text, in order of appearance."""
+        if self._regex is None:
+            return []
+        found: Dict[str, None] = {}
+        for match in self._regex.finditer(text):
+            for keyword in self.prefixes[match.group(1)]:
+                found[keyword] = None
+        return list(found)
+
+    def contains(self, text: str) -> bool:
+        """Returns True if any keyword occurs in already lower-cased text."""
+        return self._regex is not None and self._regex.search(text) is not None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'mode': self.mode, 'keywords': sorted(self.keywords),
+                'pattern': self.pattern, 'prefixes': self.prefixes}
+
+    @classmethod
+    def from_dict(cls, payload: Dict[str, Any]) -> 'KeywordIndex':
+        return cls(payload['keywords'], payload['mode'], payload['pattern'], payload['prefixes'])
+
+class KeywordDictionary:
+    """An immutable set of compiled keyword indexes, one per category."""
+
+    def __init__(self, indexes: Dict[str, KeywordIndex], source: Optional[str] = None):
+        self.indexes = indexes
+        self.source = source
+
+    @classmethod
+    def from_sets(cls, categories: Dict[str, Iterable[str]], source: Optional[str] = None) -> 'KeywordDictionary':
+        return cls({
+            name: KeywordIndex(keywords, CATEGORY_MODES.get(name, 'substring'))
+            for name, keywords in categories.items()
+        }, source)
+
+    def get(self, category: str) -> KeywordIndex:
+        """Returns the index for a category, or an empty index if the dictionary does not define it."""
+        index = self.indexes.get(category)
+        if index is None:
+            index = KeywordIndex((), CATEGORY_MODES.get(category, 'substring'))
+        return index
+
+    @property
+    def profanity(self) -> KeywordIndex:
+        return self.get('profanity')
+
+    @property
+    def sensitive(self) -> KeywordIndex:
+        return self.get('sensitive')
+
+    @property
+    def verification(self) -> KeywordIndex:
+        return self.get('verification')
+
+def _read_dictionary_file(path: str) -> Tuple[Dict[str, List[str]], str]:
+    with open(path, 'rb') as fh:
+        raw = fh.read()
+    text = raw.decode('utf-8')
+    content = json.loads(text) if path.endswith('.json') else yaml.safe_load(text)
+    if not isinstance(content, dict):
+        raise ValueError(f"Keyword dictionary '{path}' must map category names to keyword lists.")
+    categories = {}
+    for name, keywords in content.items():
+        if not isinstance(keywords, list):
+            raise ValueError(f"Category '{name}' in '{path}' must be a list of keywords.")
+        categories[str(name)] = [str(kw) for kw in keywords]
+    return categories, hashlib.sha256(raw).hexdigest()
+
+def load_dictionary(path: str, cache_dir: Optional[str] = None) -> KeywordDictionary:
+    """
+    Loads a keyword dictionary file and compiles it, reusing an on-disk compiled index
+    when the file content has not changed since it was last compiled. Writing the cache is
+    best-effort: if it fails, the error is logged and the compiled dictionary is still returned.
+    """
+    categories, digest = _read_dictionary_file(path)
+    cache_path = None
+    if cache_dir:
+        cache_path = os.path.join(cache_dir, f"{digest}.json")
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as fh:
+                cached = json.load(fh)
+            if cached.get('version') == INDEX_VERSION:
+                return KeywordDictionary(
+                    {name: KeywordIndex.from_dict(payload) for name, payload in cached['indexes'].items()}, path
+                )
+        except (OSError, ValueError, KeyError):
+            pass
+
+    dictionary = KeywordDictionary.from_sets(categories, path)
+
+    if cache_path:
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as fh:
+                json.dump({'version': INDEX_VERSION,
+                           'indexes': {name: index.to_dict() for name, index in dictionary.indexes.items()}}, fh)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            logger.warning("Could not cache compiled dictionary %s in %s: %s", path, cache_dir, e)
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+    return dictionary
+
+class KeywordDictionaryStore:
+    """
+    Serves per-client, per-language keyword dictionaries from a directory tree laid out as
+    `<root>/<client>/<language>.yaml` (or .yml/.json).
+
+    Dictionaries are compiled once and kept in memory. Every `check_interval` seconds a lookup
+    stats the backing file; if it changed, a new dictionary is compiled and swapped in whole,
+    so concurrent readers always see either the old or the new dictionary, never a mix.
+    """
+
+    def __init__(self, root: str, fallback: Optional[KeywordDictionary] = None,
+                 default_client: str = 'default', check_interval: float = 2.0):
+        self.root = root
+        self.fallback = fallback
+        self.default_client = default_client
+        self.check_interval = check_interval
+        self.cache_dir = os.path.join(root, CACHE_DIR_NAME)
+        self._lock = threading.Lock()
+        # (client, language) -> (path, (mtime_ns, size), last_checked, dictionary)
+        self._entries: Dict[Tuple[str, str], Tuple[Optional[str], Optional[Tuple[int, int]], float, KeywordDictionary]] = {}
+
+    def _resolve_path(self, client: str, language: str) -> Optional[str]:
+        for candidate_client in (client, self.default_client):
+            for ext in DICTIONARY_EXTENSIONS:
+                path = os.path.join(self.root, candidate_client, f"{language}{ext}")
+                if os.path.isfile(path):
+                    return path
+        return None
+
+    @staticmethod
+    def _signature(path: Optional[str]) -> Optional[Tuple[int, int]]:
+        if path is None:
+            return None
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def get(self, client: str = 'default', language: str = 'en') -> KeywordDictionary:
+        """Returns the current dictionary for a client and language, reloading it if its file changed."""
+        key = (client, language)
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None and now - entry[2] < self.check_interval:
+            return entry[3]
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[2] < self.check_interval:
+                return entry[3]
+
+            path = self._resolve_path(client, language)
+            signature = self._signature(path)
+            if entry is not None and entry[0] == path and entry[1] == signature:
+                self._entries[key] = (path, signature, now, entry[3])
+                return entry[3]
+
+            if path is None:
+                if self.fallback is None:
+                    raise FileNotFoundError(f"No keyword dictionary for client '{client}', language '{language}'.")
+                dictionary = self.fallback
+            else:
+                try:
+                    dictionary = load_dictionary(path, self.cache_dir)
+                except (OSError, ValueError, yaml.YAMLError):
+                    # A half-written or malformed file must not take down a running service;
+                    # keep serving the previous dictionary until the file is fixed.
+                    if entry is None:
+                        raise
+                    self._entries[key] = (entry[0], entry[1], now, entry[3])
+                    return entry[3]
+            self._entries[key] = (path, signature, now, dictionary)
+            return dictionary
+
+    def reload(self) -> None:
+        """Forces every dictionary to be re-checked on its next lookup."""
+        with self._lock:
+            self._entries.clear()
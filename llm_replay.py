@@ -0,0 +1,109 @@
+import hashlib
+import json
+import os
+import time
+from typing import Dict, Any, Optional
+
+from analysis_functions import LLM_MODEL_NAME, estimate_tokens
+
+class ReplayMissError(LookupError):
+    """Raised when a replaying model is asked for a prompt that was never recorded."""
+
+class LLMResponse:
+    """Minimal stand-in for a Gemini response: just the text analyze_with_llm reads."""
+
+    def __init__(self, text: str, latency: float = 0.0):
+        self.text = text
+        self.latency = latency
+
+def recording_key(prompt: str, generation_config: Optional[Dict[str, Any]] = None,
+                  model_name: str = LLM_MODEL_NAME) -> str:
+    """Deterministic key for a request: identical prompt, config and model map to the same recording."""
+    payload = json.dumps({'model': model_name, 'prompt': prompt, 'config': generation_config or {}}, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class _TrackedModel:
+    """Base class that tracks request count, estimated tokens and latency across calls."""
+
+    def __init__(self, store_dir: str, model_name: str = LLM_MODEL_NAME):
+        self.store_dir = store_dir
+        self.model_name = model_name
+        self.reset_usage()
+
+    def reset_usage(self) -> None:
+        self.requests = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.latency = 0.0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.store_dir, key[:2], f"{key}.json")
+
+    def _track(self, prompt: str, response: LLMResponse) -> LLMResponse:
+        self.requests += 1
+        self.input_tokens += estimate_tokens(prompt)
+        self.output_tokens += estimate_tokens(response.text)
+        self.latency += response.latency
+        return response
+
+class RecordingModel(_TrackedModel):
+    """
+    Wraps a live model and writes every response to `store_dir`, keyed by prompt and config.
+
+    Prompts that were already recorded are served from disk instead of calling the API again,
+    so a recording run can be resumed after an interruption.
+    """
+
+    def __init__(self, model: Any, store_dir: str, model_name: str = LLM_MODEL_NAME):
+        super().__init__(store_dir, model_name)
+        self.model = model
+
+    def generate_content(self, prompt: str, generation_config: Optional[Dict[str, Any]] = None) -> LLMResponse:
+        key = recording_key(prompt, generation_config, self.model_name)
+        path = self._path(key)
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as fh:
+                record = json.load(fh)
+            return self._track(prompt, LLMResponse(record['text'], record['latency']))
+
+        start = time.perf_counter()
+        response = self.model.generate_content(prompt, generation_config=generation_config)
+        latency = time.perf_counter() - start
+        record = {'model': self.model_name, 'prompt': prompt, 'config': generation_config,
+                  'text': response.text, 'latency': latency}
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as fh:
+            json.dump(record, fh)
+        os.replace(tmp_path, path)
+        return self._track(prompt, LLMResponse(response.text, latency))
+
+class ReplayModel(_TrackedModel):
+    """
+    Serves recorded responses from `store_dir` without any network access.
+
+    Latency reported for each response is the one measured when it was recorded, so
+    benchmarks stay comparable across machines. Unrecorded prompts raise ReplayMissError.
+    """
+
+    def generate_content(self, prompt: str, generation_config: Optional[Dict[str, Any]] = None) -> LLMResponse:
+        key = recording_key(prompt, generation_config, self.model_name)
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as fh:
+                record = json.load(fh)
+        except FileNotFoundError:
+            raise ReplayMissError(f"No recorded response for prompt {key[:12]} in {self.store_dir}.")
+        return self._track(prompt, LLMResponse(record['text'], record['latency']))
+
+def make_model(mode: str, store_dir: str, api_key: str = "", model_name: str = LLM_MODEL_NAME) -> _TrackedModel:
+    """Builds a model for 'record' (live calls, saved to disk) or 'replay' (offline) mode."""
+    if mode == 'replay':
+        return ReplayModel(store_dir, model_name)
+    if mode == 'record':
+        import google.generativeai as genai
+        if not api_key:
+            raise ValueError("Recording needs a Gemini API key.")
+        genai.configure(api_key=api_key)
+        return RecordingModel(genai.GenerativeModel(model_name), store_dir, model_name)
+    raise ValueError(f"Unknown LLM mode: {mode}")
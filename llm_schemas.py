@@ -0,0 +1,126 @@
+import json
+import re
+from typing import Dict, List, Tuple, Any, Optional
+
+# Expected result fields per analysis entity: field -> (kind, description shown to the model).
+# Kinds: 'bool' (true/false), 'list' (list of strings), 'confidence' (high/medium/low).
+LLM_RESPONSE_SCHEMAS = {
+    'Profanity Detection': {
+        'agent_profanity': ('bool', 'boolean'),
+        'customer_profanity': ('bool', 'boolean'),
+        'agent_examples': ('list', '["specific profane text from agent"]'),
+        'customer_examples': ('list', '["specific profane text from customer"]'),
+        'profanity_confidence': ('confidence', '"high/medium/low"'),
+    },
+    'Privacy and Compliance Violation': {
+        'compliance_violation': ('bool', 'boolean'),
+        'verification_attempted': ('bool', 'boolean'),
+        'violation_examples': ('list', '["specific violations"]'),
+        'verification_examples': ('list', '["verification attempts"]'),
+        'compliance_confidence': ('confidence', '"high/medium/low"'),
+    },
+}
+
+CONFIDENCE_LEVELS = ('high', 'medium', 'low')
+_TRUE_STRINGS = {'true', 'yes', 'y', '1'}
+_FALSE_STRINGS = {'false', 'no', 'n', '0', 'none'}
+_FENCE_RE = re.compile(r'```(?:json)?\s*|\s*```')
+
+def parse_llm_json(text: str) -> Dict[str, Any]:
+    """
+    Parses the JSON object in an LLM response.
+
+    The model is asked for application/json, so the raw text is tried first; code fences and
+    surrounding prose are only stripped when that fails. A list of objects yields its first object.
+    Raises ValueError if no JSON object can be recovered.
+    """
+    text = text.strip()
+    try:
+        parsed = json.loads(text)
+    except ValueError:
+        cleaned = _FENCE_RE.sub('', text)
+        start, end = cleaned.find('{'), cleaned.rfind('}')
+        if start == -1 or end < start:
+            raise ValueError("No JSON object found in LLM response.")
+        try:
+            parsed = json.loads(cleaned[start:end + 1])
+        except ValueError as e:
+            raise ValueError(f"Failed to decode JSON from LLM response: {e}")
+
+    if isinstance(parsed, list) and parsed and isinstance(parsed[0], dict):
+        parsed = parsed[0]
+    if not isinstance(parsed, dict):
+        raise ValueError("Received an unexpected format from LLM.")
+    return parsed
+
+def _coerce(kind: str, value: Any) -> Tuple[bool, Any]:
+    """Coerces a value to a field kind, returning (ok, value)."""
+    if kind == 'bool':
+        if isinstance(value, bool):
+            return True, value
+        if isinstance(value, (int, float)) and value in (0, 1):
+            return True, bool(value)
+        if isinstance(value, str):
+            lowered = value.strip().lower()
+            if lowered in _TRUE_STRINGS:
+                return True, True
+            if lowered in _FALSE_STRINGS:
+                return True, False
+        return False, None
+
+    if kind == 'list':
+        if value is None:
+            return True, []
+        if isinstance(value, str):
+            return True, [value] if value.strip() else []
+        if isinstance(value, list):
+            return True, [item if isinstance(item, str) else json.dumps(item) for item in value if item is not None]
+        return False, None
+
+    if kind == 'confidence':
+        if isinstance(value, str):
+            lowered = value.strip().lower()
+            if lowered in CONFIDENCE_LEVELS:
+                return True, lowered
+        return False, None
+
+    raise ValueError(f"Unknown schema field kind: {kind}")
+
+def validate_llm_response(entity: str, payload: Dict[str, Any],
+                          fields: Optional[List[str]] = None) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Validates and coerces an LLM payload against the entity's schema.
+
+    Returns the valid, coerced fields and the names of fields that were missing or could not be
+    coerced. A list field that is absent or null means nothing was found and becomes [] without
+    a re-ask; a list field holding anything unusable is still reported. Only `fields` are
+    checked when given, which is used when merging a re-ask response. Unknown keys are dropped.
+    """
+    schema = LLM_RESPONSE_SCHEMAS[entity]
+    result = {}
+    invalid = []
+    for field in fields or list(schema):
+        kind, _ = schema[field]
+        # An absent key is coerced like null: [] for lists, invalid for everything else.
+        ok, value = _coerce(kind, payload.get(field))
+        if ok:
+            result[field] = value
+        else:
+            invalid.append(field)
+    return result, invalid
+
+def response_format(entity: str, fields: Optional[List[str]] = None) -> str:
+    """Renders the 'Respond with JSON' block for an entity, optionally limited to some fields."""
+    schema = LLM_RESPONSE_SCHEMAS[entity]
+    lines = [f'    "{field}": {schema[field][1]}' for field in fields or list(schema)]
+    return "{\n" + ",\n".join(lines) + "\n}"
+
+def build_reask_prompt(entity: str, conversation_str: str, fields: List[str],
+                       previous: Dict[str, Any]) -> str:
+    """Builds a follow-up prompt that asks only for the fields that were missing or malformed."""
+    return f"""
+    You previously analyzed this conversation for {entity.lower()} and returned: {json.dumps(previous)}
+    These fields were missing or invalid: {', '.join(fields)}.
+    Conversation: {conversation_str}
+    Respond with JSON containing only these fields: {response_format(entity, fields)}
+    """
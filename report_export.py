@@ -0,0 +1,473 @@
+import base64
+import hashlib
+import html
+import json
+import logging
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Dict, List, Tuple, Any, Iterable, Optional
+
+from analysis_functions import analyze_profanity_pattern, analyze_compliance_pattern, DEFAULT_DICTIONARY
+from call_quality import calculate_call_quality_metrics, create_call_quality_visualizations, SpeakingIntervals
+from call_dedup import NearDuplicateIndex
+from call_triage import route_call, VOICEMAIL_PHRASES, NO_ANSWER_PHRASES, WRONG_PARTY_PHRASES
+from transcript_validation import normalize_transcript, reject_call, TranscriptValidationError
+from compliance_rules import evaluate_compliance_rules, DEFAULT_RULES, DEFAULT_TERM_SETS, TERM_SET_MODES
+
+CACHE_DIR_NAME = '.report_cache'
+# Bump when the analysis, metrics or chart output changes shape so cached entries are recomputed.
+REPORT_CACHE_VERSION = 2
+# Calls per pool task, and how many tasks per worker may be queued at once, so a large batch
+# is streamed through the pool instead of being submitted (and held in memory) all at once.
+EXPORT_CHUNK_SIZE = 16
+PENDING_CHUNKS_PER_WORKER = 2
+SPEAKER_COLORS = {'agent': '#2E8B57', 'customer': '#4169E1'}
+
+logger = logging.getLogger(__name__)
+
+_STYLE = """
+body { font-family: Arial, sans-serif; margin: 2em; color: #222; }
+h1 { font-size: 1.6em; } h2 { font-size: 1.2em; margin-top: 1.5em; }
+table { border-collapse: collapse; margin: 0.5em 0; }
+td, th { border: 1px solid #ccc; padding: 4px 10px; text-align: left; vertical-align: top; }
+.flag { color: #B22222; font-weight: bold; } .ok { color: #2E8B57; }
+.utterance { margin: 2px 0; } .speaker { font-weight: bold; }
+"""
+
+def conversation_hash(data: List[Dict[str, Any]]) -> str:
+    """Stable content hash of a conversation; cache_key combines it with the analysis fingerprint."""
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+def analysis_fingerprint() -> str:
+    """
+    Hash of everything besides the transcript that cached analyses and charts depend on: the
+    cache version, the built-in keyword dictionary, the compliance rules and the triage phrases.
+    """
+    config = {
+        'version': REPORT_CACHE_VERSION,
+        'dictionary': {name: [index.mode, sorted(index.keywords)] for name, index in sorted(DEFAULT_DICTIONARY.indexes.items())},
+        'rules': DEFAULT_RULES,
+        'term_sets': {name: sorted(keywords) for name, keywords in sorted(DEFAULT_TERM_SETS.items())},
+        'term_set_modes': TERM_SET_MODES,
+        'triage': [sorted(VOICEMAIL_PHRASES), sorted(NO_ANSWER_PHRASES), sorted(WRONG_PARTY_PHRASES)],
+    }
+    return hashlib.sha256(json.dumps(config, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:16]
+
+_fingerprint: Optional[str] = None
+
+def cache_key(data: List[Dict[str, Any]]) -> str:
+    """Key for a call's cached analysis and charts: its content hash plus analysis_fingerprint()."""
+    global _fingerprint
+    if _fingerprint is None:
+        _fingerprint = analysis_fingerprint()
+    return f"{conversation_hash(data)}-{_fingerprint}"
+
+def _write_cache_file(path: str, payload: bytes) -> None:
+    """Atomically writes a cache entry. Best-effort: a failed write is logged, never raised."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp_path, 'wb') as fh:
+            fh.write(payload)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning("Could not write report cache entry %s: %s", path, e)
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+def _read_cached_json(cache_dir: Optional[str], kind: str, key: str) -> Optional[Any]:
+    if not cache_dir:
+        return None
+    try:
+        with open(os.path.join(cache_dir, kind, f"{key}.json"), 'r', encoding='utf-8') as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+def _cached_json(cache_dir: Optional[str], kind: str, key: str, compute):
+    if not cache_dir:
+        return compute()
+    cached = _read_cached_json(cache_dir, kind, key)
+    if cached is not None:
+        return cached
+    value = compute()
+    _write_cache_file(os.path.join(cache_dir, kind, f"{key}.json"), json.dumps(value).encode('utf-8'))
+    return value
+
+def _cached_bytes(cache_dir: Optional[str], name: str, compute) -> bytes:
+    if not cache_dir:
+        return compute()
+    path = os.path.join(cache_dir, 'charts', name)
+    try:
+        with open(path, 'rb') as fh:
+            return fh.read()
+    except OSError:
+        pass
+    value = compute()
+    _write_cache_file(path, value)
+    return value
+
+def render_quality_svg(metrics: Dict[str, Any], data: Optional[List[Dict[str, Any]]] = None, width: int = 800) -> str:
+    """
+    Renders the speaking timeline and overtalk/silence bars as a static SVG.
+
+    This draws the same information as the timeline and quality panels of
+    create_call_quality_visualizations without Plotly or a browser, so it is cheap
+    enough to produce for every call in a batch. Intervals come from the metrics if present,
+    otherwise from a compact view over `data`.
+    """
+    total = metrics.get('total_duration', 0) or 1
+    left, row_height, plot_width = 80, 22, width - 100
+    rows = {'agent': 20, 'customer': 20 + row_height + 6}
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="150" font-family="Arial" font-size="12">']
+    for speaker, y in rows.items():
+        parts.append(f'<text x="4" y="{y + 15}">{speaker.title()}</text>')
+    intervals = metrics.get('speaking_intervals')
+    if intervals is None:
+        intervals = SpeakingIntervals(data) if data else []
+    for interval in intervals:
+        speaker = 'agent' if 'agent' in interval.get('speaker', '') else 'customer'
+        x = left + plot_width * interval['start'] / total
+        w = max(1.0, plot_width * (interval['end'] - interval['start']) / total)
+        parts.append(f'<rect x="{x:.1f}" y="{rows[speaker]}" width="{w:.1f}" height="{row_height}" '
+                     f'fill="{SPEAKER_COLORS[speaker]}"/>')
+    parts.append(f'<text x="{left}" y="86">0s</text>')
+    parts.append(f'<text x="{left + plot_width}" y="86" text-anchor="end">{metrics.get("total_duration", 0)}s</text>')
+
+    for i, (label, key, color) in enumerate((('Overtalk %', 'overtalk_percentage', '#FF6B6B'),
+                                              ('Silence %', 'silence_percentage', '#FFB6C1'))):
+        y = 100 + i * 24
+        value = metrics.get(key, 0)
+        parts.append(f'<text x="4" y="{y + 14}">{label}</text>')
+        parts.append(f'<rect x="{left}" y="{y}" width="{plot_width * min(value, 100) / 100:.1f}" height="18" fill="{color}"/>')
+        parts.append(f'<text x="{left + 4}" y="{y + 14}">{value:.2f}%</text>')
+    parts.append('</svg>')
+    return ''.join(parts)
+
+def render_quality_png(metrics: Dict[str, Any], data: Optional[List[Dict[str, Any]]] = None) -> bytes:
+    """Renders the full Plotly dashboard to PNG. Needs the optional `kaleido` package."""
+    try:
+        return create_call_quality_visualizations(metrics, data).to_image(format='png', width=1200, height=800)
+    except ValueError as e:
+        raise RuntimeError(f"PNG charts need the 'kaleido' package (pip install kaleido): {e}")
+
+def _full_analysis(data: List[Dict[str, Any]]) -> Dict[str, Any]:
+    agent_profanity, customer_profanity, profanity_details = analyze_profanity_pattern(data)
+    violation, violation_details = analyze_compliance_pattern(data)
+    rules_violated, rule_results = evaluate_compliance_rules(data)
+    return {
+        'profanity': {'agent': agent_profanity, 'customer': customer_profanity, 'details': profanity_details},
+        'compliance': {'violation': violation, 'details': violation_details},
+        'rules': {'violation': rules_violated, 'results': rule_results},
+    }
+
+def analyze_call(data: List[Dict[str, Any]], cache_dir: Optional[str] = None, triage: bool = False,
+                 reuse_key: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Runs the pattern analyzers and call quality metrics for one call, reusing cached results.
+
+    With `triage`, the call goes through call_triage.route_call first: voicemail, no-answer and
+    wrong-party calls only get the reduced profanity and disclosure check, stored under 'reduced'.
+    `reuse_key` is the cache key of a near-duplicate call; if its analysis is cached, the
+    findings are reused and only this call's own metrics are computed.
+    """
+    kind = 'analysis-triage' if triage else 'analysis'
+    if reuse_key is not None:
+        analysis = _read_cached_json(cache_dir, kind, reuse_key)
+        if analysis is not None:
+            analysis['metrics'] = calculate_call_quality_metrics(data, intervals='none')
+            return analysis
+
+    def compute():
+        if triage:
+            routed = route_call(data, _full_analysis)
+            analysis = routed['result'] if 'result' in routed else {'reduced': routed}
+            analysis['triage'] = routed['triage']
+        else:
+            analysis = _full_analysis(data)
+        # Intervals are rebuilt from the transcript when a chart needs them, so cached
+        # analyses only hold scalar metrics.
+        analysis['metrics'] = calculate_call_quality_metrics(data, intervals='none')
+        return analysis
+    return _cached_json(cache_dir, kind, cache_key(data), compute)
+
+def _flag(value: bool, yes: str = 'Detected', no: str = 'None') -> str:
+    return f'<span class="flag">{yes}</span>' if value else f'<span class="ok">{no}</span>'
+
+def _render_pattern_sections(analysis: Dict[str, Any]) -> List[str]:
+    esc = html.escape
+    profanity, compliance, rules = analysis['profanity'], analysis['compliance'], analysis['rules']
+    parts = ['<h2>🤖 Pattern-Based Analysis</h2><table>']
+    parts.append(f'<tr><th>Agent Profanity</th><td>{_flag(profanity["agent"])}</td></tr>')
+    parts.append(f'<tr><th>Customer Profanity</th><td>{_flag(profanity["customer"])}</td></tr>')
+    parts.append(f'<tr><th>Compliance Violation</th><td>{_flag(compliance["violation"])}</td></tr></table>')
+    for d in profanity['details']:
+        parts.append(f'<p><b>{esc(d["speaker"])}</b> at <i>{esc(d["timestamp"])}</i>: "...{esc(d["text"])}..."</p>')
+    for d in compliance['details']:
+        parts.append(f'<p class="flag">Violation at {esc(d["timestamp"])}: "...{esc(d["text"])}..."</p>'
+                     f'<p>Keywords Found: {esc(", ".join(d["keywords_found"]))}</p>')
+
+    parts.append('<h2>📋 Compliance Rules</h2><table><tr><th>Rule</th><th>Result</th><th>Details</th></tr>')
+    for rule_id, details in rules['results'].items():
+        detail_html = '<br>'.join(f'{esc(d["timestamp"])}: {esc(d["text"])}' for d in details)
+        parts.append(f'<tr><td>{esc(rule_id)}</td><td>{_flag(bool(details), "Violated", "Passed")}</td><td>{detail_html}</td></tr>')
+    parts.append('</table>')
+    return parts
+
+def render_call_report(call_id: str, data: List[Dict[str, Any]], analysis: Dict[str, Any],
+                       chart: Tuple[str, Any], llm_results: Optional[Dict[str, Dict[str, Any]]] = None,
+                       duplicate_of: Optional[str] = None) -> str:
+    """Renders a self-contained HTML report for one call."""
+    esc = html.escape
+    metrics = analysis['metrics']
+
+    parts = [f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>Call {esc(call_id)}</title>'
+             f'<style>{_STYLE}</style></head><body>',
+             f'<h1>📞 Call Report: {esc(call_id)}</h1>']
+    if duplicate_of:
+        parts.append(f'<p>Near-duplicate of call <b>{esc(duplicate_of)}</b>: its findings are reused below.</p>')
+    parts += [
+             '<h2>📈 Call Quality Overview</h2><table>',
+             f'<tr><th>Total Duration</th><td>{metrics["total_duration"]}s</td></tr>',
+             f'<tr><th>Silence %</th><td>{metrics["silence_percentage"]:.2f}%</td></tr>',
+             f'<tr><th>Overtalk %</th><td>{metrics["overtalk_percentage"]:.2f}%</td></tr>',
+             f'<tr><th>Agent vs Customer Talk Time</th><td>{metrics["agent_speaking_time"]:.1f}s / '
+             f'{metrics["customer_speaking_time"]:.1f}s</td></tr></table>']
+
+    kind, content = chart
+    if kind == 'svg':
+        parts.append(content)
+    elif kind == 'png':
+        parts.append(f'<img alt="Call Quality Dashboard" src="data:image/png;base64,{base64.b64encode(content).decode("ascii")}">')
+
+    if 'triage' in analysis:
+        triage = analysis['triage']
+        parts.append(f'<h2>🔎 Call Type</h2><p><b>{esc(triage["category"])}</b>: {esc(triage["reason"])}</p>')
+    if 'reduced' in analysis:
+        reduced = analysis['reduced']
+        profanity = reduced['profanity']
+        parts.append('<p>Not a live conversation: only profanity and agent disclosures were checked.</p><table>')
+        parts.append(f'<tr><th>Agent Profanity</th><td>{_flag(profanity["agent"])}</td></tr>')
+        parts.append(f'<tr><th>Customer Profanity</th><td>{_flag(profanity["customer"])}</td></tr>')
+        parts.append(f'<tr><th>Disclosure Violation</th><td>{_flag(reduced["disclosure_violation"])}</td></tr></table>')
+        for d in profanity['details']:
+            parts.append(f'<p><b>{esc(d["speaker"])}</b> at <i>{esc(d["timestamp"])}</i>: "...{esc(d["text"])}..."</p>')
+        for d in reduced['disclosures']:
+            parts.append(f'<p class="flag">Disclosure at {esc(d["timestamp"])}: "...{esc(d["text"])}..."</p>'
+                         f'<p>Keywords Found: {esc(", ".join(d["keywords_found"]))}</p>')
+    else:
+        parts.extend(_render_pattern_sections(analysis))
+
+    if llm_results:
+        parts.append('<h2>🧠 AI-Powered Analysis</h2>')
+        for entity, result in llm_results.items():
+            parts.append(f'<h3>{esc(entity)}</h3><table>')
+            for key, value in result.items():
+                shown = ', '.join(map(str, value)) if isinstance(value, list) else str(value)
+                parts.append(f'<tr><th>{esc(key)}</th><td>{esc(shown)}</td></tr>')
+            parts.append('</table>')
+
+    parts.append('<h2>Full Conversation Transcript</h2>')
+    for item in data:
+        parts.append(f'<p class="utterance"><span class="speaker">{esc(str(item.get("speaker", "")))}</span> '
+                     f'({item.get("stime", 0)}s - {item.get("etime", 0)}s): {esc(str(item.get("text", "")))}</p>')
+    parts.append('</body></html>')
+    return '\n'.join(parts)
+
+def _safe_filename(call_id: str) -> str:
+    return ''.join(ch if ch.isalnum() or ch in '-_.' else '_' for ch in call_id) or 'call'
+
+def _unique_filename(call_id: str, used: set) -> str:
+    """A _safe_filename not yet in `used` (compared case-insensitively), suffixed -2, -3... if needed."""
+    base = stem = _safe_filename(call_id)
+    n = 1
+    while stem.lower() in used:
+        n += 1
+        stem = f"{base}-{n}"
+    used.add(stem.lower())
+    return stem
+
+def export_call_report(call_id: str, data: List[Dict[str, Any]], out_dir: str, chart_format: str = 'svg',
+                       llm_results: Optional[Dict[str, Dict[str, Any]]] = None, triage: bool = False,
+                       duplicate_of: Optional[Tuple[str, str]] = None, file_stem: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Writes `<out_dir>/calls/<file_stem>.html` and returns the summary row for the batch index.
+
+    `file_stem` defaults to the sanitized call id. `duplicate_of` is (call id, cache key) of an
+    earlier near-duplicate whose analysis to reuse.
+    """
+    cache_dir = os.path.join(out_dir, CACHE_DIR_NAME)
+    analysis = analyze_call(data, cache_dir, triage, duplicate_of[1] if duplicate_of else None)
+    original = duplicate_of[0] if duplicate_of else None
+    key = cache_key(data)
+    if chart_format == 'svg':
+        chart = ('svg', _cached_bytes(cache_dir, f"{key}.svg",
+                                      lambda: render_quality_svg(analysis['metrics'], data).encode('utf-8')).decode('utf-8'))
+    elif chart_format == 'png':
+        chart = ('png', _cached_bytes(cache_dir, f"{key}.png", lambda: render_quality_png(analysis['metrics'], data)))
+    else:
+        chart = ('none', None)
+
+    filename = os.path.join('calls', f"{file_stem or _safe_filename(call_id)}.html")
+    path = os.path.join(out_dir, filename)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as fh:
+        fh.write(render_call_report(call_id, data, analysis, chart, llm_results, original))
+
+    metrics = analysis['metrics']
+    row = {
+        'call_id': call_id,
+        'file': filename,
+        'category': analysis['triage']['category'] if 'triage' in analysis else None,
+        'duplicate_of': original,
+        'duration': metrics['total_duration'],
+        'silence_percentage': metrics['silence_percentage'],
+        'overtalk_percentage': metrics['overtalk_percentage'],
+    }
+    if 'reduced' in analysis:
+        reduced = analysis['reduced']
+        row.update(profanity=reduced['profanity']['agent'] or reduced['profanity']['customer'],
+                   compliance_violation=reduced['disclosure_violation'], rules_violated=[])
+    else:
+        row.update(profanity=analysis['profanity']['agent'] or analysis['profanity']['customer'],
+                   compliance_violation=analysis['compliance']['violation'],
+                   rules_violated=[rule_id for rule_id, details in analysis['rules']['results'].items() if details])
+    return row
+
+def _export_job(job: Tuple[str, List[Dict[str, Any]], str, str, Optional[Dict[str, Dict[str, Any]]], bool,
+                             Optional[Tuple[str, str]], str]) -> Dict[str, Any]:
+    return export_call_report(*job)
+
+def _export_chunk(chunk: List[Tuple]) -> List[Dict[str, Any]]:
+    return [_export_job(job) for job in chunk]
+
+def render_batch_index(rows: List[Dict[str, Any]], rejected: Optional[List[Dict[str, Any]]] = None,
+                       dedup_stats: Optional[Dict[str, Any]] = None) -> str:
+    """Renders the batch summary page linking every per-call report, and any calls that were skipped."""
+    esc = html.escape
+    triaged = any(r.get('category') for r in rows)
+    parts = [f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>Batch Report</title>'
+             f'<style>{_STYLE}</style></head><body>',
+             f'<h1>📊 Batch Report ({len(rows)} calls)</h1>',
+             f'<p>Profanity: {sum(r["profanity"] for r in rows)} calls &middot; '
+             f'Compliance violations: {sum(r["compliance_violation"] for r in rows)} calls</p>']
+    if dedup_stats:
+        parts.append(f'<p>Near-duplicates: {dedup_stats["duplicates"]} of {dedup_stats["calls"]} calls '
+                     f'({dedup_stats["dedup_rate"] * 100:.1f}%) reused an earlier call\'s analysis</p>')
+    parts += ['<table><tr><th>Call</th>' + ('<th>Call Type</th>' if triaged else '') +
+             '<th>Duration</th><th>Silence %</th><th>Overtalk %</th>'
+             '<th>Profanity</th><th>Compliance</th><th>Rules Violated</th></tr>']
+    for r in rows:
+        category = f'<td>{esc(r.get("category") or "")}</td>' if triaged else ''
+        duplicate = f' (duplicate of {esc(r["duplicate_of"])})' if r.get('duplicate_of') else ''
+        parts.append(f'<tr><td><a href="{esc(r["file"])}">{esc(r["call_id"])}</a>{duplicate}</td>{category}<td>{r["duration"]}s</td>'
+                     f'<td>{r["silence_percentage"]:.2f}</td><td>{r["overtalk_percentage"]:.2f}</td>'
+                     f'<td>{_flag(r["profanity"])}</td><td>{_flag(r["compliance_violation"])}</td>'
+                     f'<td>{esc(", ".join(r["rules_violated"]))}</td></tr>')
+    parts.append('</table>')
+    if rejected:
+        parts.append(f'<h2>Skipped Calls ({len(rejected)})</h2><table><tr><th>Call</th><th>Reason</th></tr>')
+        for r in rejected:
+            parts.append(f'<tr><td>{esc(r["source"])}</td><td>{esc(r["reason"])}</td></tr>')
+        parts.append('</table>')
+    parts.append('</body></html>')
+    return '\n'.join(parts)
+
+def export_batch_reports(conversations: Iterable[Tuple[str, List[Dict[str, Any]]]], out_dir: str,
+                         chart_format: str = 'svg', workers: Optional[int] = None,
+                         llm_results: Optional[Dict[str, Dict[str, Dict[str, Any]]]] = None,
+                         triage: bool = False,
+                         rejected: Optional[List[Dict[str, Any]]] = None,
+                         dedup: Optional[NearDuplicateIndex] = None) -> List[Dict[str, Any]]:
+    """
+    Renders per-call reports and an `index.html` summary for a batch of calls.
+
+    Calls are rendered in a process pool so exports never touch the Streamlit UI thread, with
+    only a few chunks per worker in flight so the input can be a lazy iterator of any size;
+    `workers=0` renders in the calling process. `llm_results` optionally maps call ids to
+    {entity: analyze_with_llm result} to include stored AI findings. With `triage`, voicemail,
+    no-answer and wrong-party calls only get the reduced check (see analyze_call). Calls that
+    fail normalize_transcript are skipped, appended to `rejected` and listed in the index. With
+    a `dedup` index, near-duplicate calls reuse the first call's cached analysis and the index
+    reports the dedup rate.
+    """
+    if chart_format not in ('svg', 'png', 'none'):
+        raise ValueError(f"Unknown chart format: {chart_format}")
+    os.makedirs(out_dir, exist_ok=True)
+    llm_results = llm_results or {}
+    rejected = [] if rejected is None else rejected
+
+    def valid_calls():
+        for call_id, data in conversations:
+            try:
+                yield call_id, normalize_transcript(data)
+            except TranscriptValidationError as e:
+                reject_call(rejected, str(call_id), str(e))
+
+    # Call ids come from file basenames, so two folders can hold the same id; every report
+    # gets its own file stem, which also identifies the call to the dedup index.
+    used_stems: set = set()
+    # file stem -> (call id, cache key) of every call analyzed itself, for near-duplicates to reuse
+    group_keys: Dict[str, Tuple[str, str]] = {}
+
+    def make_jobs():
+        for call_id, data in valid_calls():
+            stem = _unique_filename(str(call_id), used_stems)
+            duplicate_of = None
+            if dedup is not None:
+                match = dedup.add(stem, data)
+                if match is None:
+                    group_keys[stem] = (call_id, cache_key(data))
+                else:
+                    duplicate_of = group_keys[match[0]]
+            yield call_id, data, out_dir, chart_format, llm_results.get(call_id), triage, duplicate_of, stem
+
+    jobs = make_jobs()
+
+    if workers == 0:
+        rows = [_export_job(job) for job in jobs]
+    else:
+        rows = []
+        max_pending = (workers or os.cpu_count() or 1) * PENDING_CHUNKS_PER_WORKER
+        pending = deque()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for chunk in iter(lambda: list(islice(jobs, EXPORT_CHUNK_SIZE)), []):
+                if len(pending) >= max_pending:
+                    rows.extend(pending.popleft().result())
+                pending.append(executor.submit(_export_chunk, chunk))
+            while pending:
+                rows.extend(pending.popleft().result())
+
+    with open(os.path.join(out_dir, 'index.html'), 'w', encoding='utf-8') as fh:
+        fh.write(render_batch_index(rows, rejected, dedup.stats() if dedup is not None else None))
+    return rows
+
+if __name__ == "__main__":
+    import argparse
+    from transcript_cache import iter_conversations_from_zip, TranscriptCache
+
+    parser = argparse.ArgumentParser(description="Export static HTML reports for a batch of calls.")
+    parser.add_argument("source", help="Zip of JSON/YAML conversations or a packed transcript cache")
+    parser.add_argument("out_dir", help="Directory to write the reports to")
+    parser.add_argument("--charts", choices=("svg", "png", "none"), default="svg")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--triage", action="store_true", help="Only check profanity and disclosures on voicemail, no-answer and wrong-party calls")
+    parser.add_argument("--dedup", action="store_true", help="Reuse the analysis of near-duplicate calls")
+    args = parser.parse_args()
+
+    dedup = NearDuplicateIndex() if args.dedup else None
+    rejected = []
+    if args.source.endswith('.zip'):
+        rows = export_batch_reports(iter_conversations_from_zip(args.source, rejected), args.out_dir, args.charts,
+                                    args.workers, triage=args.triage, rejected=rejected, dedup=dedup)
+    else:
+        with TranscriptCache(args.source) as cache:
+            rows = export_batch_reports(cache.iter_calls(), args.out_dir, args.charts, args.workers,
+                                        triage=args.triage, rejected=rejected, dedup=dedup)
+    print(f"Wrote {len(rows)} call reports to {args.out_dir}, skipped {len(rejected)} invalid calls")
+    if dedup is not None:
+        print(f"{dedup.duplicates} of {dedup.seen} calls reused a near-duplicate's analysis")
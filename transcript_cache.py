@@ -0,0 +1,262 @@
+import json
+import mmap
+import os
+import struct
+import zipfile
+from array import array
+from typing import Dict, List, Tuple, Any, Iterable, Iterator, Optional
+
+import yaml
+
+from transcript_validation import Transcript, normalize_transcript, reject_call, TranscriptValidationError
+
+# File layout (all integers little-endian, every section 8-byte aligned):
+#   header   : magic, version, call count, utterance count, section offsets
+#   meta     : UTF-8 JSON with the call ids and the speaker table
+#   calls    : uint64[n_calls + 1] utterance offsets (call i spans calls[i]..calls[i+1])
+#   stime    : float64[n_utts]
+#   etime    : float64[n_utts]
+#   int_mask : uint8[n_utts] bit 0 set if stime was an int, bit 1 if etime was
+#   speaker  : uint16[n_utts] codes into the speaker table
+#   text_off : uint64[n_utts + 1] byte offsets into the text blob
+#   text     : UTF-8 text of every utterance, concatenated
+CACHE_MAGIC = b'DCCT'
+CACHE_VERSION = 2
+_HEADER = struct.Struct('<4sHHIQ8Q')
+_SECTIONS = ('meta', 'calls', 'stime', 'etime', 'int_mask', 'speaker', 'text_off', 'text')
+_STIME_INT = 1
+_ETIME_INT = 2
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+def load_conversation_file(name: str, content: bytes) -> List[Dict[str, Any]]:
+    """Parses a JSON or YAML conversation file the same way the app does."""
+    text = content.decode('utf-8')
+    return yaml.safe_load(text) if name.endswith(('yaml', 'yml')) else json.loads(text)
+
+def iter_conversations_from_zip(zip_path: str,
+                                rejected: Optional[List[Dict[str, Any]]] = None) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+    """
+    Yields (call_id, transcript) for every conversation file inside a zip archive.
+
+    Each file is validated with normalize_transcript. Files that cannot be parsed or hold no
+    usable conversation are skipped and recorded in `rejected` with the reason.
+    """
+    with zipfile.ZipFile(zip_path) as archive:
+        for info in archive.infolist():
+            name = info.filename
+            if info.is_dir() or '.ipynb_checkpoints' in name:
+                continue
+            if not name.endswith(('.json', '.yaml', '.yml')):
+                continue
+            call_id = os.path.splitext(os.path.basename(name))[0]
+            try:
+                data = normalize_transcript(load_conversation_file(name, archive.read(info)))
+            except (ValueError, yaml.YAMLError) as e:
+                # TranscriptValidationError, JSONDecodeError and UnicodeDecodeError are ValueErrors.
+                reject_call(rejected, call_id, str(e), name)
+                continue
+            yield call_id, data
+
+def pack_conversations(conversations: Iterable[Tuple[str, List[Dict[str, Any]]]], path: str,
+                       rejected: Optional[List[Dict[str, Any]]] = None) -> Dict[str, int]:
+    """
+    Packs conversations into the binary transcript cache at `path`.
+
+    Timestamps and speaker codes are stored column-wise and all text goes into a single
+    UTF-8 blob, so a reader can slice any call without parsing JSON. The file is written
+    to a temporary path and renamed into place, so readers never see a partial cache.
+    Timestamps are stored as float64 with a flag for those that were ints, so a call reads
+    back exactly as it was packed. Calls are normalized first; calls that fail validation are skipped and recorded in
+    `rejected`.
+    """
+    call_ids: List[str] = []
+    speakers: List[str] = []
+    speaker_codes: Dict[str, int] = {}
+    calls = array('Q', [0])
+    stimes, etimes = array('d'), array('d')
+    int_mask = array('B')
+    codes = array('H')
+    text_offsets = array('Q', [0])
+    text_blob = bytearray()
+
+    invalid = 0
+    for call_id, data in conversations:
+        try:
+            data = normalize_transcript(data)
+        except TranscriptValidationError as e:
+            reject_call(rejected, str(call_id), str(e))
+            invalid += 1
+            continue
+        call_ids.append(str(call_id))
+        for entry in data:
+            speaker = str(entry.get('speaker', ''))
+            if speaker not in speaker_codes:
+                if len(speakers) > 0xFFFF:
+                    raise ValueError("Too many distinct speaker labels for the transcript cache.")
+                speaker_codes[speaker] = len(speakers)
+                speakers.append(speaker)
+            stime, etime = entry['stime'], entry['etime']
+            stimes.append(float(stime))
+            etimes.append(float(etime))
+            int_mask.append((_STIME_INT if isinstance(stime, int) else 0) | (_ETIME_INT if isinstance(etime, int) else 0))
+            codes.append(speaker_codes[speaker])
+            text_blob += str(entry.get('text', '')).encode('utf-8')
+            text_offsets.append(len(text_blob))
+        calls.append(len(stimes))
+
+    meta = json.dumps({'call_ids': call_ids, 'speakers': speakers}).encode('utf-8')
+    payloads = [meta, calls.tobytes(), stimes.tobytes(), etimes.tobytes(), int_mask.tobytes(),
+                codes.tobytes(), text_offsets.tobytes(), bytes(text_blob)]
+
+    offsets = []
+    position = _align(_HEADER.size)
+    for payload in payloads:
+        offsets.append(position)
+        position = _align(position + len(payload))
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as fh:
+        fh.write(_HEADER.pack(CACHE_MAGIC, CACHE_VERSION, 0, len(call_ids), len(stimes), *offsets))
+        for offset, payload in zip(offsets, payloads):
+            fh.write(b'\0' * (offset - fh.tell()))
+            fh.write(payload)
+        fh.write(b'\0' * (position - fh.tell()))
+    os.replace(tmp_path, path)
+
+    return {"calls": len(call_ids), "utterances": len(stimes), "bytes": position, "rejected": invalid}
+
+def build_cache_from_zip(zip_path: str, cache_path: str) -> Dict[str, int]:
+    """Converts a zip of JSON/YAML conversations (e.g. All_Conversations.zip) into a transcript cache."""
+    rejected: List[Dict[str, Any]] = []
+    stats = pack_conversations(iter_conversations_from_zip(zip_path, rejected), cache_path, rejected)
+    stats['rejected'] = len(rejected)
+    return stats
+
+class TranscriptCache:
+    """
+    Read-only, memory-mapped view over a packed transcript cache.
+
+    Column accessors return memoryviews into the mapping, so iterating timestamps or
+    speaker codes never copies or parses anything. Text is only decoded when asked for.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"Transcript cache '{path}' is empty.")
+        if len(self._mm) < _HEADER.size:
+            self.close()
+            raise ValueError(f"'{path}' is too short to be a transcript cache.")
+        magic, version, _, n_calls, n_utts, *offsets = _HEADER.unpack_from(self._mm, 0)
+        if magic != CACHE_MAGIC or version != CACHE_VERSION:
+            self.close()
+            raise ValueError(f"'{path}' is not a version {CACHE_VERSION} transcript cache.")
+
+        section = dict(zip(_SECTIONS, offsets))
+        view = memoryview(self._mm)
+        meta = json.loads(bytes(view[section['meta']:section['calls']]).rstrip(b'\0'))
+        self.call_ids: List[str] = meta['call_ids']
+        self.speakers: List[str] = meta['speakers']
+        self._call_index = {call_id: i for i, call_id in enumerate(self.call_ids)}
+
+        self._view = view
+        self._calls = view[section['calls']:section['calls'] + 8 * (n_calls + 1)].cast('Q')
+        self._stime = view[section['stime']:section['stime'] + 8 * n_utts].cast('d')
+        self._etime = view[section['etime']:section['etime'] + 8 * n_utts].cast('d')
+        self._int_mask = view[section['int_mask']:section['int_mask'] + n_utts]
+        self._speaker = view[section['speaker']:section['speaker'] + 2 * n_utts].cast('H')
+        self._text_off = view[section['text_off']:section['text_off'] + 8 * (n_utts + 1)].cast('Q')
+        self._text = view[section['text']:section['text'] + self._text_off[n_utts]]
+        self.utterance_count = n_utts
+
+    def __enter__(self) -> 'TranscriptCache':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Releases the memory views and the mapping.
+
+        If a caller still holds a view returned by `columns` or `text_bytes`, the mapping
+        cannot be unmapped yet; it is then left for the garbage collector to reclaim.
+        """
+        for name in ('_calls', '_stime', '_etime', '_int_mask', '_speaker', '_text_off', '_text', '_view'):
+            view = self.__dict__.pop(name, None)
+            if view is not None:
+                view.release()
+        if getattr(self, '_mm', None) is not None:
+            try:
+                self._mm.close()
+            except BufferError:
+                pass
+            self._mm = None
+        self._file.close()
+
+    def __len__(self) -> int:
+        return len(self.call_ids)
+
+    def _resolve(self, call: Any) -> int:
+        return self._call_index[call] if isinstance(call, str) else call
+
+    def call_range(self, call: Any) -> Tuple[int, int]:
+        """Returns the [start, end) utterance range for a call, by index or id."""
+        i = self._resolve(call)
+        return self._calls[i], self._calls[i + 1]
+
+    def columns(self, call: Any) -> Tuple[memoryview, memoryview, memoryview]:
+        """Returns zero-copy (stime, etime, speaker_code) columns for a call."""
+        start, end = self.call_range(call)
+        return self._stime[start:end], self._etime[start:end], self._speaker[start:end]
+
+    def text_bytes(self, utterance: int) -> memoryview:
+        """Returns the raw UTF-8 bytes of an utterance without decoding them."""
+        return self._text[self._text_off[utterance]:self._text_off[utterance + 1]]
+
+    def text(self, utterance: int) -> str:
+        return str(self.text_bytes(utterance), 'utf-8')
+
+    def iter_utterances(self, call: Any) -> Iterator[Tuple[str, str, Any, Any]]:
+        """Yields (speaker, text, stime, etime) tuples for a call, with timestamps typed as packed."""
+        start, end = self.call_range(call)
+        for j in range(start, end):
+            mask = self._int_mask[j]
+            stime, etime = self._stime[j], self._etime[j]
+            yield (self.speakers[self._speaker[j]], self.text(j),
+                   int(stime) if mask & _STIME_INT else stime, int(etime) if mask & _ETIME_INT else etime)
+
+    def get_call(self, call: Any) -> Transcript:
+        """
+        Materializes a call in the regular list-of-dicts format used by the analyzers.
+
+        Calls were normalized when packed, so the result is a sorted Transcript that matches
+        the same call loaded from its source file.
+        """
+        return Transcript([
+            {'speaker': speaker, 'text': text, 'stime': stime, 'etime': etime}
+            for speaker, text, stime, etime in self.iter_utterances(call)
+        ], is_sorted=True)
+
+    def iter_calls(self) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+        """Yields (call_id, utterances) for every call in the cache."""
+        for i, call_id in enumerate(self.call_ids):
+            yield call_id, self.get_call(i)
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Pack a zip of conversation files into a binary transcript cache.")
+    parser.add_argument("zip_path", help="Zip archive of JSON/YAML conversations")
+    parser.add_argument("cache_path", help="Output cache file")
+    args = parser.parse_args()
+
+    stats = build_cache_from_zip(args.zip_path, args.cache_path)
+    print(f"Packed {stats['calls']} calls / {stats['utterances']} utterances into {args.cache_path} ({stats['bytes']} bytes), "
+          f"skipped {stats['rejected']} invalid calls")
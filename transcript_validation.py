@@ -0,0 +1,171 @@
+import logging
+import math
+from typing import Dict, List, Tuple, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+class TranscriptValidationError(ValueError):
+    """Raised when a transcript cannot be used; `errors` lists (row index, reason) pairs."""
+
+    def __init__(self, message: str, errors: Optional[List[Tuple[int, str]]] = None):
+        super().__init__(message)
+        self.errors = errors or []
+
+class Transcript(list):
+    """
+    A validated conversation: a plain list of utterance dicts sorted by (stime, etime).
+
+    `is_sorted` lets downstream code skip its own sort. Only normalize_transcript sets it,
+    and any mutation that can reorder rows clears it again. `rejected` keeps the rows that
+    were dropped as invalid, with the reason for each, and `duplicates` the rows that were
+    collapsed into an earlier identical utterance.
+    """
+
+    def __init__(self, rows: List[Dict[str, Any]] = (), rejected: Optional[List[Dict[str, Any]]] = None,
+                 duplicates: Optional[List[Dict[str, Any]]] = None, is_sorted: bool = False):
+        super().__init__(rows)
+        self.rejected = rejected or []
+        self.duplicates = duplicates or []
+        self.is_sorted = is_sorted
+
+    def append(self, row):
+        self.is_sorted = False
+        super().append(row)
+
+    def extend(self, rows):
+        self.is_sorted = False
+        super().extend(rows)
+
+    def insert(self, index, row):
+        self.is_sorted = False
+        super().insert(index, row)
+
+    def __setitem__(self, index, value):
+        self.is_sorted = False
+        super().__setitem__(index, value)
+
+    def __iadd__(self, rows):
+        self.is_sorted = False
+        return super().__iadd__(rows)
+
+    def __imul__(self, count):
+        self.is_sorted = False
+        return super().__imul__(count)
+
+    def sort(self, *args, **kwargs):
+        self.is_sorted = False
+        super().sort(*args, **kwargs)
+
+    def reverse(self):
+        self.is_sorted = False
+        super().reverse()
+
+def is_sorted_transcript(data: Any) -> bool:
+    """True if `data` is known to be sorted by start time (i.e. it came from normalize_transcript)."""
+    return getattr(data, 'is_sorted', False)
+
+def reject_call(rejected: Optional[List[Dict[str, Any]]], call_id: str, reason: str,
+                source: Optional[str] = None) -> None:
+    """Logs a call that cannot be used and records it in `rejected`, if given."""
+    logger.warning("Skipping call %s: %s", call_id, reason)
+    if rejected is not None:
+        rejected.append({'call_id': call_id, 'source': source or call_id, 'reason': reason})
+
+def _coerce_time(value: Any) -> Any:
+    """Returns a finite, non-negative number or raises ValueError with a reason."""
+    if isinstance(value, bool) or value is None:
+        raise ValueError(f"not a number: {value!r}")
+    if isinstance(value, (int, float)):
+        number = value
+    elif isinstance(value, str):
+        try:
+            number = float(value.strip().rstrip('s'))
+        except ValueError:
+            raise ValueError(f"not a number: {value!r}")
+        if number.is_integer():
+            number = int(number)
+    else:
+        raise ValueError(f"not a number: {value!r}")
+    if isinstance(number, float) and not math.isfinite(number):
+        raise ValueError(f"not finite: {value!r}")
+    if number < 0:
+        raise ValueError(f"negative: {value!r}")
+    return number
+
+def _normalize_row(row: Any) -> Dict[str, Any]:
+    if not isinstance(row, dict):
+        raise ValueError("entry is not an object")
+    for field in ('speaker', 'text', 'stime', 'etime'):
+        if field not in row:
+            raise ValueError(f"missing '{field}'")
+
+    speaker = row['speaker']
+    if speaker is None or not str(speaker).strip():
+        raise ValueError("empty 'speaker'")
+    text = row['text']
+    if text is None or isinstance(text, (dict, list)):
+        raise ValueError("'text' is not a string")
+
+    try:
+        stime = _coerce_time(row['stime'])
+    except ValueError as e:
+        raise ValueError(f"'stime' {e}")
+    try:
+        etime = _coerce_time(row['etime'])
+    except ValueError as e:
+        raise ValueError(f"'etime' {e}")
+    if stime > etime:
+        raise ValueError(f"'stime' ({stime}) is after 'etime' ({etime})")
+
+    normalized = dict(row)
+    normalized.update({'speaker': str(speaker).strip(), 'text': str(text), 'stime': stime, 'etime': etime})
+    return normalized
+
+def normalize_transcript(data: Any, strict: bool = False) -> Transcript:
+    """
+    Validates and normalizes a loaded conversation once, at load time.
+
+    Rows are type-checked and coerced (numeric strings become numbers, speakers are trimmed),
+    rows with missing fields or impossible timings are rejected with a reason, and duplicate
+    rows — the same speaker and text with overlapping timings — are collapsed into one; repeats
+    that merely touch end to start are kept as separate utterances. The result is sorted by start time. Raises TranscriptValidationError if the input is not a list,
+    if no usable rows remain, or, with `strict=True`, if any row was rejected.
+    """
+    if isinstance(data, Transcript) and data.is_sorted:
+        return data
+    if not isinstance(data, list):
+        raise TranscriptValidationError("Conversation must be a list of utterances.")
+
+    rows = []
+    rejected = []
+    for index, row in enumerate(data):
+        try:
+            rows.append((index, _normalize_row(row)))
+        except ValueError as e:
+            rejected.append({'index': index, 'reason': str(e), 'row': row})
+
+    rows.sort(key=lambda item: (item[1]['stime'], item[1]['etime'], item[0]))
+
+    # Sorted by start, so a duplicate overlaps the most recent kept row with the same speaker and text.
+    # Rows that only touch ("Hello?" 0-1s, "Hello?" 1-2s) are real repeats; identical timings always merge.
+    kept: List[Dict[str, Any]] = []
+    duplicates = []
+    last_seen: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for index, row in rows:
+        key = (row['speaker'].lower(), row['text'].strip().lower())
+        previous = last_seen.get(key)
+        if previous is not None and (row['stime'] < previous['etime'] or
+                                     (row['stime'], row['etime']) == (previous['stime'], previous['etime'])):
+            previous['etime'] = max(previous['etime'], row['etime'])
+            duplicates.append({'index': index, 'reason': 'duplicate of an overlapping utterance', 'row': data[index]})
+            continue
+        last_seen[key] = row
+        kept.append(row)
+
+    errors = [(r['index'], r['reason']) for r in rejected]
+    if not kept and data:
+        raise TranscriptValidationError("No valid utterances in conversation.", errors)
+    if strict and rejected:
+        details = '; '.join(f"row {index}: {reason}" for index, reason in errors[:5])
+        raise TranscriptValidationError(f"{len(rejected)} invalid utterance(s): {details}", errors)
+    return Transcript(kept, rejected, duplicates, is_sorted=True)